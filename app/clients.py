@@ -0,0 +1,156 @@
+import os
+import threading
+
+from app import metrics
+from app.rate_limit import RateLimiter
+
+
+class GeminiClient:
+    """
+    Reusable Gemini model handle. The GenerativeModel is built once and shared
+    by all calls; requests carry a timeout and go through an optional rate limiter.
+    """
+
+    def __init__(self, api_key, model_name="gemini-pro", timeout_seconds=30, requests_per_minute=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.timeout_seconds = timeout_seconds
+        self.rate_limiter = RateLimiter(requests_per_minute)
+
+    def generate_text(self, prompt):
+        """
+        Sends a prompt and returns the stripped text of the first candidate, or None.
+        Latency, outcome and token usage are recorded in app.metrics.
+        """
+        self.rate_limiter.wait()
+        try:
+            with metrics.span("llm_call", model=self.model_name):
+                response = self.model.generate_content(prompt, request_options={"timeout": self.timeout_seconds})
+        except Exception:
+            metrics.inc("llm_requests_total", outcome="error")
+            raise
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            metrics.inc("llm_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, kind="prompt")
+            metrics.inc("llm_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, kind="completion")
+        if response and response.candidates:
+            metrics.inc("llm_requests_total", outcome="ok")
+            return response.candidates[0].content.parts[0].text.strip()
+        metrics.inc("llm_requests_total", outcome="empty")
+        return None
+
+
+class Clients:
+    """
+    Process-wide external clients: one pooled MongoClient, one Polygon
+    RESTClient and one Gemini model handle, each created on first use and
+    closed by close(). The API hands it to endpoints as a FastAPI dependency,
+    so tests can override it with local fakes.
+    """
+
+    def __init__(self, mongo_uri=None, db_name=None, polygon_api_key=None, llm_api_key=None,
+                 llm_model_name="gemini-pro", mongo_max_pool_size=100, mongo_min_pool_size=0,
+                 mongo_timeout_ms=5000, polygon_num_pools=10, polygon_timeout_seconds=10.0,
+                 llm_timeout_seconds=30, llm_requests_per_minute=None):
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.polygon_api_key = polygon_api_key
+        self.llm_api_key = llm_api_key
+        self.llm_model_name = llm_model_name
+        self.mongo_max_pool_size = mongo_max_pool_size
+        self.mongo_min_pool_size = mongo_min_pool_size
+        self.mongo_timeout_ms = mongo_timeout_ms
+        self.polygon_num_pools = polygon_num_pools
+        self.polygon_timeout_seconds = polygon_timeout_seconds
+        self.llm_timeout_seconds = llm_timeout_seconds
+        self.llm_requests_per_minute = llm_requests_per_minute
+        self._mongo = None
+        self._polygon = None
+        self._llm = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            mongo_uri=os.getenv("MONGO_URI"),
+            db_name=os.getenv("DB_NAME"),
+            polygon_api_key=os.getenv("POLYGON_API_KEY"),
+            llm_api_key=os.getenv("LLM_API_KEY"),
+            llm_model_name=os.getenv("LLM_MODEL", "gemini-pro"),
+            mongo_max_pool_size=int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+            mongo_min_pool_size=int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+            mongo_timeout_ms=int(os.getenv("MONGO_TIMEOUT_MS", "5000")),
+            polygon_num_pools=int(os.getenv("POLYGON_NUM_POOLS", "10")),
+            polygon_timeout_seconds=float(os.getenv("POLYGON_TIMEOUT_SECONDS", "10")),
+            llm_timeout_seconds=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+            llm_requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+        )
+
+    @property
+    def mongo(self):
+        if self._mongo is None:
+            with self._lock:
+                if self._mongo is None:
+                    import pymongo
+
+                    self._mongo = pymongo.MongoClient(
+                        self.mongo_uri,
+                        maxPoolSize=self.mongo_max_pool_size,
+                        minPoolSize=self.mongo_min_pool_size,
+                        serverSelectionTimeoutMS=self.mongo_timeout_ms,
+                        connectTimeoutMS=self.mongo_timeout_ms,
+                        socketTimeoutMS=self.mongo_timeout_ms,
+                    )
+        return self._mongo
+
+    @property
+    def db(self):
+        return self.mongo[self.db_name]
+
+    def collection(self, name):
+        return self.db[name]
+
+    @property
+    def polygon(self):
+        if self._polygon is None:
+            with self._lock:
+                if self._polygon is None:
+                    from polygon import RESTClient
+
+                    self._polygon = RESTClient(
+                        api_key=self.polygon_api_key,
+                        num_pools=self.polygon_num_pools,
+                        connect_timeout=self.polygon_timeout_seconds,
+                        read_timeout=self.polygon_timeout_seconds,
+                    )
+        return self._polygon
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = GeminiClient(
+                        self.llm_api_key, self.llm_model_name, self.llm_timeout_seconds, self.llm_requests_per_minute
+                    )
+        return self._llm
+
+    def close(self):
+        """
+        Closes the pooled connections; the clients are recreated if used again.
+        """
+        with self._lock:
+            if self._mongo is not None:
+                self._mongo.close()
+                self._mongo = None
+            if self._polygon is not None:
+                # urllib3 pool manager behind the Polygon client
+                pool = getattr(self._polygon, "client", None)
+                if pool is not None and hasattr(pool, "clear"):
+                    pool.clear()
+                self._polygon = None
+            self._llm = None
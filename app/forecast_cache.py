@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app import metrics
+from app.universe import Universe
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_CLOSE_HOUR = 16
+
+
+def market_data_date(now=None):
+    """
+    Returns the date (YYYY-MM-DD) of the latest completed US trading session.
+    Before the 16:00 ET close the previous weekday is used; holidays are not
+    modelled, which at worst costs one extra recomputation.
+    """
+    now = now or datetime.now(MARKET_TZ)
+    day = now.date()
+    if now.hour < MARKET_CLOSE_HOUR:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:  # Saturday / Sunday
+        day -= timedelta(days=1)
+    return day.strftime("%Y-%m-%d")
+
+
+def artifact_digest(*paths):
+    """
+    Short content hash of the files among 'paths' that exist.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class Forecast:
+    """
+    One forecast run: a (horizon, tickers) array of predicted closes ordered by
+    'universe', plus the tickers whose forecast is masked for lack of data.
+    'bands' optionally maps quantiles (0.05, 0.5, ...) to arrays shaped like
+    'values', from a batch of perturbed rollouts.
+    """
+
+    def __init__(self, universe, values, masked=(), bands=None):
+        self.universe = universe
+        self.values = np.asarray(values, dtype=np.float64)
+        self.masked = set(masked)
+        self.bands = {float(q): np.asarray(band, dtype=np.float64) for q, band in (bands or {}).items()}
+
+    def __contains__(self, ticker):
+        return ticker in self.universe and ticker not in self.masked
+
+    def select(self, tickers):
+        """
+        Returns the (horizon, len(tickers)) slice for 'tickers' via one index vector.
+        """
+        return self.values[:, self.universe.indices(tickers)]
+
+    def by_ticker(self, tickers=None):
+        """
+        Returns {ticker: [predicted closes]} for 'tickers' (default: all unmasked tickers).
+        """
+        if tickers is None:
+            tickers = [ticker for ticker in self.universe.tickers if ticker not in self.masked]
+        return dict(zip(tickers, self.select(tickers).T.tolist()))
+
+    def select_bands(self, tickers):
+        """
+        Returns {quantile: (horizon, len(tickers)) slice} for 'tickers', empty without bands.
+        """
+        columns = self.universe.indices(tickers)
+        return {q: band[:, columns] for q, band in self.bands.items()}
+
+    def to_dict(self):
+        return {
+            "universe_version": self.universe.version,
+            "tickers": self.universe.tickers,
+            "values": self.values.tolist(),
+            "masked": sorted(self.masked),
+            "bands": {f"{q:g}": band.tolist() for q, band in self.bands.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, doc):
+        return cls(Universe(doc["tickers"], doc.get("universe_version", "adhoc")), doc["values"], doc.get("masked", ()),
+                   doc.get("bands"))
+
+
+class ForecastCache:
+    """
+    Holds the latest forecast keyed by (model_version, market_data_date).
+
+    Lookups are served from memory. On a miss the cache first tries the
+    optional snapshot (a JSON file and/or a Mongo collection) so a restarted
+    worker does not recompute, and only then calls compute_fn. A single lock
+    guards the miss path, so concurrent requests never run the computation
+    twice.
+    """
+
+    def __init__(self, compute_fn, model_version, ttl_seconds=24 * 3600,
+                 snapshot_path=None, snapshot_collection=None):
+        # Version and compute_fn are swapped together, so a forecast is never stored under another model's version
+        self._binding = (model_version, compute_fn)
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path
+        self.snapshot_collection = snapshot_collection
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def model_version(self):
+        return self._binding[0]
+
+    def bind(self, model_version, compute_fn):
+        """
+        Points the cache at another model version and the function computing its forecast.
+        """
+        self._binding = (model_version, compute_fn)
+
+    def _fresh(self, entry):
+        return entry is not None and time.time() - entry["computed_at"] < self.ttl_seconds
+
+    def get(self):
+        """
+        Returns the forecast for the current market data date, computing it at most once.
+        """
+        return self.get_versioned()[1]
+
+    def get_versioned(self):
+        """
+        Like get(), but returns (model_version, forecast) so callers know which version they got.
+        """
+        model_version, compute_fn = self._binding
+        key = (model_version, market_data_date())
+        entry = self._entries.get(key)
+        if self._fresh(entry):
+            metrics.cache_lookup("forecast", hits=1)
+            return model_version, entry["predictions"]
+
+        with self._lock:
+            # Another request may have filled the entry while we waited
+            entry = self._entries.get(key)
+            if self._fresh(entry):
+                metrics.cache_lookup("forecast", hits=1)
+                return model_version, entry["predictions"]
+
+            metrics.cache_lookup("forecast", misses=1)
+            entry = self._load_snapshot(key)
+            if self._fresh(entry):
+                metrics.cache_lookup("forecast_snapshot", hits=1)
+            else:
+                metrics.cache_lookup("forecast_snapshot", misses=1)
+                entry = {"predictions": compute_fn(), "computed_at": time.time()}
+                self._save_snapshot(key, entry)
+
+            self._entries = {key: entry}  # Only the latest day is worth keeping
+            return model_version, entry["predictions"]
+
+    def start_background_refresh(self, interval_seconds=900):
+        """
+        Starts a daemon thread that keeps the cache warm. The forecast is only
+        recomputed when the market data date rolls over or the entry expires.
+        """
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    self.get()
+                except Exception as e:
+                    print(f"Background forecast refresh failed: {e}")
+                self._stop_event.wait(interval_seconds)
+
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(target=run, name="forecast-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        self._stop_event.set()
+
+    def _load_snapshot(self, key):
+        model_version, data_date = key
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path) as f:
+                    doc = json.load(f)
+                if doc.get("model_version") == model_version and doc.get("data_date") == data_date:
+                    return {"predictions": Forecast.from_dict(doc["predictions"]), "computed_at": doc["computed_at"]}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable forecast snapshot {self.snapshot_path}: {e}")
+
+        if self.snapshot_collection is not None:
+            try:
+                doc = self.snapshot_collection.find_one({"_id": f"{model_version}:{data_date}"})
+                if doc:
+                    return {"predictions": Forecast.from_dict(doc["predictions"]), "computed_at": doc["computed_at"]}
+            except Exception as e:
+                print(f"Error loading forecast snapshot from MongoDB: {e}")
+        return None
+
+    def _save_snapshot(self, key, entry):
+        model_version, data_date = key
+        doc = {
+            "model_version": model_version,
+            "data_date": data_date,
+            "computed_at": entry["computed_at"],
+            "predictions": entry["predictions"].to_dict(),
+        }
+        if self.snapshot_path:
+            try:
+                # Write to a temp file and rename so readers never see a partial snapshot
+                tmp_path = f"{self.snapshot_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(doc, f)
+                os.replace(tmp_path, self.snapshot_path)
+            except OSError as e:
+                print(f"Error writing forecast snapshot {self.snapshot_path}: {e}")
+
+        if self.snapshot_collection is not None:
+            try:
+                self.snapshot_collection.replace_one(
+                    {"_id": f"{model_version}:{data_date}"}, doc, upsert=True
+                )
+            except Exception as e:
+                print(f"Error saving forecast snapshot to MongoDB: {e}")
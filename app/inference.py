@@ -0,0 +1,151 @@
+import os
+import uuid
+
+import numpy as np
+
+
+class KerasPredictBackend:
+    """
+    Reference backend: Keras model.predict, which sets up a data pipeline on every call.
+    """
+
+    name = "keras_predict"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, inputs):
+        return self.model.predict(inputs, verbose=0)
+
+
+class TFFunctionBackend:
+    """
+    Calls the Keras model directly inside a tf.function compiled for the
+    model's (batch, timesteps, features) input, skipping predict()'s per-call
+    dispatch overhead. The batch dimension is left open so one trace serves
+    any batch size.
+    """
+
+    name = "tf_function"
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        _, timesteps, features = model.input_shape
+        signature = [tf.TensorSpec(shape=(None, timesteps, features), dtype=tf.float32)]
+        self._call = tf.function(lambda x: model(x, training=False), input_signature=signature)
+
+    def predict(self, inputs):
+        return self._call(np.asarray(inputs, dtype=np.float32)).numpy()
+
+
+class TFLiteBackend:
+    """
+    Runs an exported TFLite graph with the TFLite interpreter. The graph is
+    converted from the Keras model once and cached next to it as .tflite.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model, model_path):
+        import tensorflow as tf
+
+        tflite_path = os.path.splitext(model_path)[0] + ".tflite"
+        if not os.path.exists(tflite_path) or os.path.getmtime(tflite_path) < os.path.getmtime(model_path):
+            converter = tf.lite.TFLiteConverter.from_keras_model(model)
+            # LSTM layers need the TF select ops and un-lowered tensor lists to convert
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS
+            ]
+            converter._experimental_lower_tensor_list_ops = False
+            # Write to a unique name and rename, so a worker starting meanwhile never loads a partial file
+            tmp_path = f"{tflite_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(converter.convert())
+            os.replace(tmp_path, tflite_path)
+
+        self.interpreter = tf.lite.Interpreter(model_path=tflite_path)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = self._input["shape"][0]
+
+    def predict(self, inputs):
+        inputs = np.asarray(inputs, dtype=np.float32)
+        if inputs.shape[0] != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input["index"], inputs.shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = inputs.shape[0]
+        self.interpreter.set_tensor(self._input["index"], inputs)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output_index).copy()
+
+
+BACKENDS = ("keras_predict", "tf_function", "tflite")
+
+
+def create_backend(name, model, model_path):
+    """
+    Builds the inference backend called 'name' (one of BACKENDS) around a loaded Keras model.
+    """
+    if name == "keras_predict":
+        return KerasPredictBackend(model)
+    if name == "tf_function":
+        return TFFunctionBackend(model)
+    if name == "tflite":
+        return TFLiteBackend(model, model_path)
+    raise ValueError(f"Unknown inference backend '{name}', expected one of {BACKENDS}.")
+
+
+def rollout(backend, window, horizon=5):
+    """
+    Autoregressive forecast: predicts one step, appends it to the input window
+    and repeats 'horizon' times.
+
+    window is a (timesteps, features) or (batch, timesteps, features) array.
+    The window lives in a preallocated float32 mirrored ring buffer of twice
+    its length: every new row is written twice, so the latest 'timesteps' rows
+    are always the slice buffer[:, head:head + timesteps] (contiguous per batch
+    row) and each step hands the model a view instead of rebuilding the window.
+    Returns a (batch, horizon, features) array.
+    """
+    window = np.asarray(window, dtype=np.float32)
+    if window.ndim == 2:
+        window = window[None]
+    batch, timesteps, features = window.shape
+
+    buffer = np.empty((batch, 2 * timesteps, features), dtype=np.float32)
+    buffer[:, :timesteps] = window
+    buffer[:, timesteps:] = window
+    predictions = np.empty((batch, horizon, features), dtype=np.float32)
+
+    head = 0  # Index of the oldest row in the current window
+    for step in range(horizon):
+        predictions[:, step] = backend.predict(buffer[:, head:head + timesteps])
+        buffer[:, head] = predictions[:, step]
+        buffer[:, head + timesteps] = predictions[:, step]
+        head = (head + 1) % timesteps
+    return predictions
+
+
+def rollout_scenarios(backend, window, horizon=5, n_scenarios=32, noise_scale=0.01, seed=0):
+    """
+    Runs the unperturbed window plus n_scenarios - 1 copies with Gaussian noise
+    added to the (scaled) inputs as one batch, so every step is a single
+    forward pass. Returns a (n_scenarios, horizon, features) array; scenario 0
+    is the unperturbed forecast.
+    """
+    window = np.asarray(window, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    batch = np.repeat(window[None], n_scenarios, axis=0)
+    batch[1:] += rng.normal(0.0, noise_scale, size=batch[1:].shape).astype(np.float32)
+    return rollout(backend, batch, horizon)
+
+
+def confidence_bands(scenarios, quantiles=(0.05, 0.5, 0.95)):
+    """
+    Reduces rollout_scenarios output to {quantile: (horizon, features) array}.
+    """
+    values = np.quantile(scenarios, quantiles, axis=0)
+    return dict(zip(quantiles, values))
@@ -1,48 +1,207 @@
-from fastapi import FastAPI, HTTPException
+from app import metrics, runtime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from polygon import RESTClient
 import pandas as pd
-from datetime import datetime, timedelta
-import numpy as np
-import yfinance as yf
-from tensorflow.keras.models import load_model
-from sklearn.preprocessing import MinMaxScaler
-import pymongo
 import os
+import threading
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
+import asyncio
+from app.clients import Clients
+from app.forecast_cache import ForecastCache, market_data_date
+from app.models import DEFAULT_REGISTRY_PATH, ModelRegistry, RoutedForecast
+from app.price_store import PriceStore
+from app.recommendation_store import ensure_indexes, load_recommendations, save_recommendations
+from app.singleflight import SingleFlight
+from app.snapshot import SnapshotReader
+from app import sentiment_store
+from app.sentiment_store import get_sentiment_summary
+from app.ticker_matcher import ExtractionCache, TickerMatcher
+from app.universe import get_universe
 
 # Disable TensorFlow ONEDNN logs
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 
-MODEL_PATH = "./app/data/lstm_model.h5"  # Change this to your actual model path
-model = load_model(MODEL_PATH)
+MODEL_PATH = "./app/data/lstm_model.h5"  # Served when there is no model registry file
 
 # Load environment variables
 load_dotenv()
-polygon_api_key = os.getenv("POLYGON_API_KEY")
 mongo_uri = os.getenv("MONGO_URI")
 db_name = os.getenv("DB_NAME")
 collection_sentiment = os.getenv("COLLECTION_SENTIMENT")
 collection_corelation = os.getenv("COLLECTION_CORELEATION")
-llm_api_key = os.getenv("LLM_API_KEY")
+collection_recommendation = os.getenv("COLLECTION_RECOMMENDATION")  # Optional precomputed recommendations
+collection_forecast = os.getenv("COLLECTION_FORECAST")  # Optional snapshot collection
+forecast_snapshot_path = os.getenv("FORECAST_SNAPSHOT_PATH")  # Optional snapshot file
+forecast_refresh_seconds = int(os.getenv("FORECAST_REFRESH_SECONDS", "900"))
+llm_concurrency = int(os.getenv("LLM_CONCURRENCY", "5"))
+llm_timeout_seconds = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+mongo_timeout_seconds = float(os.getenv("MONGO_TIMEOUT_SECONDS", "5"))
+# Ask for all related tickers in one LLM call instead of one call per ticker
+llm_batch_mode = os.getenv("LLM_BATCH_MODE", "true").lower() == "true"
+recommendation_batch_size = int(os.getenv("RECOMMENDATION_BATCH_SIZE", "10"))  # Tickers per batched prompt
+sentiment_window_days = int(os.getenv("SENTIMENT_WINDOW_DAYS", "14"))
+sentiment_top_n = int(os.getenv("SENTIMENT_TOP_N", "5"))  # Reasoning snippets per ticker in the prompt
+batch_max_items = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+forecast_horizon = int(os.getenv("FORECAST_HORIZON", "5"))  # Trading days to predict
+model_registry_path = os.getenv("MODEL_REGISTRY_PATH", DEFAULT_REGISTRY_PATH)
+model_reload_seconds = int(os.getenv("MODEL_RELOAD_SECONDS", "60"))  # 0 disables polling the registry file
+# Set on API workers to serve what resources/publish_snapshots.py publishes there instead of loading models
+snapshot_dir = os.getenv("SNAPSHOT_DIR")
+warmup_retry_seconds = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))
+extraction_cache_ttl_seconds = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(24 * 3600)))
 
-# Initialize clients
-client = RESTClient(api_key=polygon_api_key)
-mongo_client = pymongo.MongoClient(mongo_uri)
-db = mongo_client[db_name]
-collection_sentiment_db = db[collection_sentiment]
-collection_corelation_db = db[collection_corelation]
-genai.configure(api_key=llm_api_key)
+universe = get_universe()
+price_store = PriceStore()
+# Caps concurrent Gemini calls across all requests in this worker
+llm_semaphore = asyncio.Semaphore(llm_concurrency)
+# Blocking Gemini calls run on these threads only, so the bound holds even for calls whose caller timed out
+llm_executor = ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="llm")
+# Resolves obvious inputs locally and remembers what the LLM extracted for the rest
+ticker_matcher = TickerMatcher(universe.tickers, universe.aliases)
+extraction_cache = ExtractionCache(ttl_seconds=extraction_cache_ttl_seconds)
+# Concurrent requests for the same forecast, correlation row or ticker recommendation share one computation
+forecast_flight = SingleFlight("forecast")
+correlation_flight = SingleFlight("correlation")
+recommendation_flight = SingleFlight("recommendation")
+
+# Versioned forecasters; without a registry file only the LSTM at MODEL_PATH is served
+model_registry = ModelRegistry(model_registry_path, fallback_config={
+    "default": "lstm",
+    "models": {"lstm": {"kind": "lstm", "path": MODEL_PATH, "version": os.getenv("MODEL_VERSION")}},
+})
+# One forecast cache per model name, created on first use
+forecast_caches = {}
+forecast_caches_lock = threading.Lock()
+forecast_snapshot_collection = None
+# Snapshot mode: forecasts and prices are memory-mapped from the producer's snapshot, no model is loaded
+snapshot_reader = SnapshotReader(snapshot_dir) if snapshot_dir else None
+
+# Heavy dependencies (TensorFlow, pymongo, Polygon, Gemini) are imported on first use
+def get_model_registry():
+    """
+    Returns the model registry, loading and warming every configured model on first use.
+    """
+    def load():
+        model_registry.reload()
+        return model_registry
+    return runtime.load_once("model_load", load)
+
+def current_snapshot():
+    """
+    Returns the published snapshot this worker serves; raises 503 until the producer has published one.
+    """
+    snapshot = snapshot_reader.current()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail=f"No snapshot has been published to {snapshot_dir} yet.")
+    return snapshot
+
+def serving_models():
+    """
+    Model routing this worker answers with: the published one in snapshot mode, the local registry otherwise.
+    """
+    if snapshot_reader is not None:
+        return current_snapshot().models
+    return get_model_registry()
+
+def get_clients():
+    """
+    Shared Mongo / Polygon / Gemini clients for this process. Endpoints receive
+    it as a FastAPI dependency, so tests can override it with local fakes.
+    """
+    return runtime.load_once("clients", Clients.from_env)
+
+def warm_up():
+    """
+    Loads the heavy dependencies and runs one dummy inference per model so the
+    first real request does not pay for graph building.
+    """
+    global forecast_snapshot_collection
+    clients = get_clients()
+    steps = [
+        ("snapshot", current_snapshot) if snapshot_reader is not None else ("model_warmup", get_model_registry),
+        ("mongo_ping", lambda: clients.mongo.admin.command("ping")),
+        ("genai", lambda: clients.llm),
+    ]
+    while steps:
+        failed = []
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                step()
+                runtime.record_timing(name, started)
+                runtime.errors.pop(name, None)
+            except Exception as e:
+                runtime.errors[name] = str(e)
+                print(f"Warm-up step '{name}' failed: {e}")
+                failed.append((name, step))
+        steps = failed
+        if steps:
+            time.sleep(warmup_retry_seconds)
+
+    if collection_forecast:
+        forecast_snapshot_collection = clients.collection(collection_forecast)
+        for cache in list(forecast_caches.values()):
+            cache.snapshot_collection = forecast_snapshot_collection
+    if collection_recommendation:
+        ensure_indexes(clients.collection(collection_recommendation))
+    sentiment_store.ensure_indexes(clients.collection(collection_sentiment))
+    if snapshot_reader is None:
+        for name in model_registry.models_in_use():
+            get_forecast_cache(name).start_background_refresh(forecast_refresh_seconds)
+        if model_reload_seconds > 0:
+            model_registry.start_watching(model_reload_seconds)
+    runtime.mark_ready()
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Starts warm-up in the background so the liveness check answers immediately,
+    while /ready reports 503 until the model and clients are loaded.
+    """
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+    model_registry.stop_watching()
+    for cache in list(forecast_caches.values()):
+        cache.stop_background_refresh()
+    if runtime.is_loaded("clients"):
+        get_clients().close()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Records end-to-end latency per route template and status code.
+    """
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.observe(
+            "http_request_seconds", time.perf_counter() - started,
+            route=getattr(route, "path", "unmatched"), status=status,
+        )
 
 # Request model for API input
 class StockRequest(BaseModel):
     user_input: str
 
+# Request model for the batch endpoint: explicit tickers and/or free-text queries
+class BatchRecommendationRequest(BaseModel):
+    tickers: list[str] = []
+    queries: list[str] = []
+    model: str | None = None
+
 @app.get("/")
 def health_check():
     """
@@ -50,69 +209,475 @@ def health_check():
     """
     return {"status": "Stock recommendation service is running."}
 
+@app.get("/ready")
+def readiness_check():
+    """
+    FastAPI endpoint for readiness: 200 once the model is warmed up and the clients are connected.
+    """
+    return JSONResponse(runtime.status(), status_code=200 if runtime.is_ready() else 503)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    FastAPI endpoint exposing stage latencies, cache hit rates and LLM usage in Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/models")
+def list_models():
+    """
+    FastAPI endpoint listing the served models, their versions and the per-ticker routing.
+    """
+    return serving_models().describe()
+
+@app.post("/models/reload")
+def reload_models():
+    """
+    FastAPI endpoint that rereads the model registry and hot-swaps changed models in this worker.
+    Other workers pick the change up within MODEL_RELOAD_SECONDS.
+    """
+    if snapshot_reader is not None:
+        raise HTTPException(status_code=409, detail="Models are reloaded by the snapshot producer in snapshot mode.")
+    try:
+        reloaded = get_model_registry().reload()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading models: {e}")
+    return {"reloaded": reloaded, **model_registry.describe()}
+
 @app.get("/stock_recommendation")
-def stock_recommendation(user_input: str):
+async def stock_recommendation(user_input: str, stream: str | None = None, model: str | None = None,
+                               clients: Clients = Depends(get_clients)):
     """
     FastAPI endpoint that processes user input and returns a stock recommendation.
+    Sentiment reads and LLM calls for the related tickers run concurrently; a
+    ticker whose call times out is returned with an error entry instead of
+    failing the whole request.
+
+    With stream=ndjson or stream=sse the recommendations are streamed instead:
+    the asked-about ticker first, then each related ticker as it completes,
+    then a summary event. 'model' forces one registered forecaster for every
+    ticker instead of the per-ticker routing.
     """
     if not user_input:
         return "Please enter which stock you want to analyze?"
+    if stream not in (None, *STREAM_FORMATS):
+        raise HTTPException(status_code=400, detail=f"stream must be one of {list(STREAM_FORMATS)}.")
+    started = time.perf_counter()
     try:
-        # Extract ticker from user input using Gemini AI
-        prompt = (
-            f"You are a stock trading assistant. Extract the NASDAQ-100 company ticker symbol "
-            f"and the action the user wants to perform from the following input: '{user_input}'.\n\n"
-            f"Return the output in valid JSON format with two fields:\n"
-            f'{{"ticker": "<ticker>", "action": "<action>"}}\n\n'
-        )
-
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
-        if response and response.candidates:
-            json_response = response.candidates[0].content.parts[0].text.strip()
-            stock_details = json.loads(json_response)  # Convert to JSON
-        else:
-            raise HTTPException(status_code=500, detail="No valid response from API.")
-
-        # Extract ticker
-        sample_ticker = stock_details.get("ticker")
-        # print("Ticker being considered = "+sample_ticker)
-        if not sample_ticker:
-            raise HTTPException(status_code=400, detail="Failed to extract ticker from input.")
-
-        # Fetch related stocks from MongoDB
-        related_stocks = []
-        result = collection_corelation_db.find_one({"ticker": sample_ticker})
-        if result:
-            related_stocks = result["correlations"]
-        related_stocks.insert(0, sample_ticker)
-        print("list of Ticker being considered = ",related_stocks)
-        # Get predicted prices & sentiment analysis
-        predicted_closing_rate = {}
-        sentiment_analysis_results = {}
-        recommendation = []
-        predicted_data_all= predict_stock_close_price()
-        for stock in related_stocks[:5]:
-            predicted_closing_rate[stock] = predicted_data_all[stock]
-            sentiment_analysis_results[stock] = get_sentiment_by_ticker(
-                mongo_uri, db, collection_sentiment_db, stock
+        stocks, forecast = await resolve_stocks(clients, user_input, model)
+        if stream:
+            return StreamingResponse(
+                stream_recommendations(clients, stocks, forecast, stream, started),
+                media_type=STREAM_FORMATS[stream],
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
             )
-            # Get stock recommendation using LLM
-            recommendation.append(get_stock_recommendation(stock, predicted_closing_rate[stock], sentiment_analysis_results[stock]))
 
-        return recommendation
+        # Get sentiment analysis & stock recommendation for every ticker
+        recommendation = await recommend_stocks(clients, stocks, forecast)
+        return [recommendation[stock] for stock in stocks]
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing stock recommendation: {e}")
 
-def get_stock_recommendation(stock_name, predictions, sentiment_summary):
+async def resolve_stocks(clients, user_input, model=None):
+    """
+    Extracts the ticker from the user's input and returns (tickers to score,
+    forecast): the extracted ticker first, then up to four correlated tickers
+    that have a forecast.
+    """
+    # Extract ticker from user input using Gemini AI
+    stock_details = await extract_stock_details(clients.llm, user_input)
+
+    # Extract ticker
+    sample_ticker = stock_details.get("ticker")
+    # print("Ticker being considered = "+sample_ticker)
+    if not sample_ticker:
+        raise HTTPException(status_code=400, detail="Failed to extract ticker from input.")
+
+    # Fetch related stocks from MongoDB while the forecast is looked up
+    related_stocks, forecast = await asyncio.gather(
+        correlation_flight.do(sample_ticker, lambda: asyncio.to_thread(find_related_stocks, clients, sample_ticker)),
+        get_forecast(model),
+    )
+    # The list is shared with other requests, so build a new one
+    related_stocks = [sample_ticker] + related_stocks
+    print("list of Ticker being considered = ",related_stocks)
+
+    # Tickers without a forecast (outside the model's universe or masked) are skipped
+    if sample_ticker not in forecast:
+        raise HTTPException(status_code=400, detail=f"No price forecast available for {sample_ticker}.")
+    return [stock for stock in dict.fromkeys(related_stocks) if stock in forecast][:5], forecast
+
+# Streaming formats for /stock_recommendation and their media types
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def format_event(stream, event, data):
+    if stream == "sse":
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    return json.dumps({"event": event, **data}, default=str) + "\n"
+
+async def stream_recommendations(clients, stocks, forecast, stream, started):
+    """
+    Yields one 'recommendation' event per ticker as it completes and a final
+    'summary' event. The primary ticker is scored on its own so it never
+    waits for the batched prompt of the related tickers.
+    """
+    primary, related = await asyncio.gather(
+        start_recommendations(clients, stocks[:1], forecast),
+        start_recommendations(clients, stocks[1:], forecast),
+    )
+
+    async def labelled(stock, pending):
+        return stock, await pending
+
+    failed = []
+    first = True
+    for next_result in [labelled(*item) for item in primary.items()] + list(
+        asyncio.as_completed([labelled(*item) for item in related.items()])
+    ):
+        try:
+            stock, recommendation = await next_result
+        except Exception as e:
+            yield format_event(stream, "error", {"detail": f"Error processing stock recommendation: {e}"})
+            continue
+        elapsed = time.perf_counter() - started
+        if first:
+            metrics.observe("stage_seconds", elapsed, stage="stream_first_result")
+            first = False
+        if not isinstance(recommendation, dict) or "error" in recommendation:
+            failed.append(stock)
+        yield format_event(stream, "recommendation", {
+            "ticker": stock, "primary": stock == stocks[0],
+            "recommendation": recommendation, "elapsed_ms": round(elapsed * 1000, 1),
+        })
+
+    yield format_event(stream, "summary", {
+        "tickers": stocks, "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+
+@app.post("/stock_recommendation/batch")
+async def stock_recommendation_batch(request: BatchRecommendationRequest, clients: Clients = Depends(get_clients)):
+    """
+    FastAPI endpoint that scores many tickers and/or free-text queries at once.
+    The forecast is computed once, each distinct ticker is read and scored once,
+    and LLM calls are packed RECOMMENDATION_BATCH_SIZE tickers per prompt.
+    """
+    if len(request.tickers) + len(request.queries) > batch_max_items:
+        raise HTTPException(status_code=400, detail=f"At most {batch_max_items} tickers and queries per batch.")
+    try:
+        details = await asyncio.gather(
+            *(extract_stock_details(clients.llm, query) for query in request.queries),
+            return_exceptions=True,
+        )
+        query_tickers = {
+            query: stock_details.get("ticker") if isinstance(stock_details, dict) else None
+            for query, stock_details in zip(request.queries, details)
+        }
+
+        forecast = await get_forecast(request.model)
+        tickers = list(dict.fromkeys(request.tickers + [t for t in query_tickers.values() if t]))
+        known = [ticker for ticker in tickers if ticker in forecast]
+
+        recommendation = await recommend_stocks(clients, known, forecast)
+        for ticker in tickers:
+            if ticker not in forecast:
+                recommendation[ticker] = {"stock_name": ticker, "error": "No price forecast available."}
+        return {"queries": query_tickers, "recommendations": recommendation}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch recommendation: {e}")
+
+@app.get("/forecast/{ticker}")
+async def ticker_forecast(ticker: str, model: str | None = None):
+    """
+    FastAPI endpoint returning a ticker's predicted closes from the model it is
+    routed to (or 'model'), plus quantile bands when that model runs scenarios.
+    """
+    forecast = await get_forecast(model)
+    if ticker not in forecast:
+        raise HTTPException(status_code=404, detail=f"No price forecast available for {ticker}.")
+    return {
+        "ticker": ticker,
+        "model": forecast.model_for(ticker),
+        "version": forecast.version_for(ticker),
+        "data_date": forecast.data_date,
+        "predictions": forecast.predictions([ticker])[0],
+        "bands": forecast.bands(ticker),
+    }
+
+@app.get("/recommendations/{ticker}")
+def stored_recommendation(ticker: str, clients: Clients = Depends(get_clients)):
+    """
+    FastAPI endpoint serving the precomputed recommendation for the current market data date.
+    """
+    if not collection_recommendation:
+        raise HTTPException(status_code=404, detail="Precomputed recommendations are not configured.")
+    stored = load_recommendations(
+        clients.collection(collection_recommendation), [ticker], serving_data_date(),
+        serving_version(ticker),
+    )
+    if ticker not in stored:
+        raise HTTPException(status_code=404, detail=f"No recommendation for {ticker} yet today.")
+    return stored[ticker]
+
+async def recommend_stocks(clients, stocks, forecast, use_stored=True):
+    """
+    Returns {ticker: recommendation} for 'stocks'. Recommendations already
+    stored for today's data date are reused; the rest get their sentiment read
+    concurrently, are scored by the LLM and written back to the store.
+    """
+    pending = await start_recommendations(clients, stocks, forecast, use_stored)
+    results = await asyncio.gather(*pending.values())
+    return dict(zip(pending, results))
+
+async def start_recommendations(clients, stocks, forecast, use_stored=True):
+    """
+    Starts scoring 'stocks' and returns {ticker: awaitable recommendation}
+    without waiting for the LLM, so callers can consume results as they finish.
+    Results are keyed on the forecast's data date, which in snapshot mode lags
+    the clock until the producer publishes the new day.
+    """
+    data_date = forecast.data_date
+    stored = {}
+    if collection_recommendation and use_stored and stocks:
+        stored = await asyncio.to_thread(
+            load_stored_recommendations, clients.collection(collection_recommendation), stocks, data_date, forecast
+        )
+    pending = [stock for stock in dict.fromkeys(stocks) if stock not in stored]
+    if collection_recommendation and use_stored:
+        metrics.cache_lookup("recommendation", hits=len(stored), misses=len(pending))
+
+    # Tickers another request is already scoring for this data date are awaited, not scored again
+    flights = recommendation_flight.do_many(
+        [(stock, data_date, forecast.version_for(stock)) for stock in pending],
+        lambda keys: score_stocks(clients, keys, forecast),
+    ) if pending else {}
+    results = {stock: resolved(stored[stock]) for stock in stored}
+    results.update({key[0]: flight for key, flight in flights.items()})
+    return {stock: results[stock] for stock in dict.fromkeys(stocks)}
+
+def load_stored_recommendations(collection, stocks, data_date, forecast):
+    """
+    Reads stored recommendations, each ticker matched against the version of the model serving it.
+    """
+    by_version = {}
+    for stock in stocks:
+        by_version.setdefault(forecast.version_for(stock), []).append(stock)
+    stored = {}
+    for version, group in by_version.items():
+        stored.update(load_recommendations(collection, group, data_date, version))
+    return stored
+
+def resolved(value):
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(value)
+    return future
+
+async def score_stocks(clients, keys, forecast):
+    """
+    Reads sentiment for the (ticker, data_date, model_version) 'keys', asks the
+    LLM for recommendations and stores them. Returns {key: recommendation}.
+    """
+    pending = [stock for stock, _, _ in keys]
+    data_date = keys[0][1]
+
+    # Get sentiment analysis for every ticker concurrently
+    sentiments = await asyncio.gather(*(read_sentiment(clients, stock) for stock in pending))
+    predictions = forecast.predictions(pending)
+
+    # Get stock recommendation using LLM; a lone ticker gets the simpler single prompt
+    if llm_batch_mode and len(pending) > 1:
+        chunks = [
+            (pending[i:i + recommendation_batch_size],
+             predictions[i:i + recommendation_batch_size],
+             sentiments[i:i + recommendation_batch_size])
+            for i in range(0, len(pending), recommendation_batch_size)
+        ]
+        results = [rec for chunk in await asyncio.gather(*(recommend_batch(clients.llm, *chunk) for chunk in chunks)) for rec in chunk]
+    else:
+        results = await asyncio.gather(*(
+            recommend_ticker(clients.llm, *item) for item in zip(pending, predictions, sentiments)
+        ))
+
+    if collection_recommendation:
+        by_version = {}
+        for (stock, _, version), result in zip(keys, results):
+            by_version.setdefault(version, {})[stock] = result
+        for version, fresh in by_version.items():
+            await asyncio.to_thread(
+                save_recommendations, clients.collection(collection_recommendation), fresh, data_date, version
+            )
+    return dict(zip(keys, results))
+
+async def score_universe(tickers=None, use_stored=False, clients=None, model=None):
+    """
+    Bulk job: scores 'tickers' (default: every ticker with a forecast) and
+    stores the results for the API to serve. Used by resources/score_universe.py.
+    """
+    clients = clients or get_clients()
+    forecast = await get_forecast(model)
+    tickers = [ticker for ticker in (tickers or universe.tickers) if ticker in forecast]
+    return await recommend_stocks(clients, tickers, forecast, use_stored=use_stored)
+
+async def get_forecast(model=None):
+    """
+    Returns a RoutedForecast for the current market data date over the models
+    this request may use: 'model' alone if given, else the default plus every
+    routed model. Concurrent callers share each model's cache lookup; in
+    snapshot mode the published forecasts are used as they are.
+    """
+    # One snapshot per request, so routing and forecasts come from the same published version
+    snapshot = await asyncio.to_thread(current_snapshot) if snapshot_reader is not None else None
+    registry = snapshot.models if snapshot else await asyncio.to_thread(get_model_registry)
+    if model is not None and model not in registry:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{model}', expected one of {registry.names()}.")
+    if snapshot:
+        # Already computed by the producer; nothing to coalesce
+        forecasts = {name: snapshot.forecasts[name] for name in registry.models_in_use(model)}
+        return RoutedForecast(forecasts, registry, model, forecast_horizon, snapshot.data_date)
+    data_date = market_data_date()
+
+    async def one(name):
+        cache = get_forecast_cache(name)
+        # The version comes back with the forecast, in case a hot swap rebinds the cache meanwhile
+        return name, await forecast_flight.do((cache.model_version, data_date), lambda: asyncio.to_thread(cache.get_versioned))
+
+    forecasts = dict(await asyncio.gather(*(one(name) for name in registry.models_in_use(model))))
+    return RoutedForecast(forecasts, registry, model, forecast_horizon, data_date)
+
+async def read_sentiment(clients, stock):
+    """
+    Reads sentiment for one ticker, falling back to no sentiment on timeout.
+    """
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(get_sentiment_by_ticker, mongo_uri, db_name, clients.collection(collection_sentiment), stock),
+            mongo_timeout_seconds,
+        )
+    except asyncio.TimeoutError:
+        metrics.inc("timeouts_total", stage="sentiment_read")
+        print(f"Timed out reading sentiment for {stock}")
+        return []
+
+async def call_llm(llm, fn, *args):
+    """
+    Runs the blocking fn(llm, *args) on llm_executor within the LLM timeout.
+    The rate-limit slot is awaited before the timeout starts, and a call still
+    queued when its caller gives up is skipped instead of spending quota.
+    Raises asyncio.TimeoutError.
+    """
+    limiter = getattr(llm, "rate_limiter", None)
+    if limiter is not None:
+        await limiter.wait_async()
+    abandoned = threading.Event()
+
+    def run():
+        if abandoned.is_set():
+            return None
+        if limiter is None:
+            return fn(llm, *args)
+        with limiter.prepaid():
+            return fn(llm, *args)
+
+    try:
+        return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(llm_executor, run), llm_timeout_seconds)
+    except asyncio.TimeoutError:
+        abandoned.set()
+        raise
+
+async def recommend_ticker(llm, stock, predictions, sentiment):
+    """
+    Asks the LLM for one ticker's recommendation, bounded by llm_semaphore and the LLM timeout.
+    """
+    async with llm_semaphore:
+        try:
+            return await call_llm(llm, get_stock_recommendation, stock, predictions, sentiment)
+        except asyncio.TimeoutError:
+            metrics.inc("timeouts_total", stage="llm_call")
+            return {"stock_name": stock, "error": "Timed out waiting for Gemini API."}
+
+async def recommend_batch(llm, stocks, predictions, sentiments):
+    """
+    Asks the LLM for all tickers in one call. Tickers missing from the parsed
+    batch answer fall back to concurrent single-ticker calls.
+    """
+    items = list(zip(stocks, predictions, sentiments))
+    async with llm_semaphore:
+        try:
+            batch_results = await call_llm(llm, get_stock_recommendations_batch, items)
+        except asyncio.TimeoutError:
+            metrics.inc("timeouts_total", stage="llm_call")
+            return [{"stock_name": stock, "error": "Timed out waiting for Gemini API."} for stock in stocks]
+
+    missing = [item for item in items if item[0] not in batch_results]
+    if missing:
+        print("Falling back to single recommendations for ", [item[0] for item in missing])
+        fallback = await asyncio.gather(*(recommend_ticker(llm, *item) for item in missing))
+        batch_results.update({item[0]: result for item, result in zip(missing, fallback)})
+    return [batch_results[stock] for stock in stocks]
+
+def match_stock_details(user_input):
+    """
+    Resolves the user's input without Gemini: an input naming a single known
+    company, or an answer cached for the same normalized input. Returns None otherwise.
+    """
+    stock_details = ticker_matcher.match(user_input)
+    metrics.cache_lookup("ticker_matcher", hits=int(bool(stock_details)), misses=int(not stock_details))
+    if stock_details:
+        return stock_details
+    stock_details = extraction_cache.get(user_input)
+    metrics.cache_lookup("extraction", hits=int(bool(stock_details)), misses=int(not stock_details))
+    return stock_details or None
+
+def ask_stock_details(llm, user_input):
+    """
+    Asks Gemini AI for the ticker and action in the user's input and caches the parsed answer.
+    """
+    prompt = (
+        f"You are a stock trading assistant. Extract the NASDAQ-100 company ticker symbol "
+        f"and the action the user wants to perform from the following input: '{user_input}'.\n\n"
+        f"Return the output in valid JSON format with two fields:\n"
+        f'{{"ticker": "<ticker>", "action": "<action>"}}\n\n'
+    )
+
+    json_response = llm.generate_text(prompt)
+    if json_response is None:
+        raise HTTPException(status_code=500, detail="No valid response from API.")
+    stock_details = json.loads(json_response)  # Convert to JSON
+    if stock_details.get("ticker"):
+        extraction_cache.set(user_input, stock_details)
+    return stock_details
+
+async def extract_stock_details(llm, user_input):
+    """
+    Extracts the ticker and action from the user's input. Inputs resolved
+    locally never touch the LLM; the rest go to Gemini AI through call_llm,
+    bounded by llm_semaphore and the LLM timeout like recommendation calls.
+    """
+    with metrics.span("ticker_extraction"):
+        stock_details = match_stock_details(user_input)
+        if stock_details:
+            return stock_details
+        async with llm_semaphore:
+            try:
+                return await call_llm(llm, ask_stock_details, user_input)
+            except asyncio.TimeoutError:
+                metrics.inc("timeouts_total", stage="ticker_extraction")
+                raise HTTPException(status_code=504, detail="Timed out waiting for Gemini API.")
+
+def get_stock_recommendation(llm, stock_name, predictions, sentiment_summary):
     """
     Uses Gemini AI to generate stock recommendations (buy/sell/hold) based on predictions & sentiment.
     """
     prompt = (
         f"You are a stock trading assistant helping investors make decisions.\n"
         f"The user wants to make an investment decision for the stock '{stock_name}'.\n"
-        f"Here is are the price prediction for next 5 days for {stock_name}: {predictions}.\n"
+        f"Here is are the price prediction for next {len(predictions)} days for {stock_name}: {predictions}.\n"
         f"Here is a summary of recent sentiment analysis for {stock_name}:\n"
         f"'{sentiment_summary}'\n\n"
         f"Based on this prediction data and sentiment, provide a recommendation. I want you to build your response on the sentiment and sentiment_reasoning field to give a description which provides an answer based on historical data and why a certain descision is being made.\n"
@@ -122,14 +687,13 @@ def get_stock_recommendation(stock_name, predictions, sentiment_summary):
     )
 
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
+        json_response = llm.generate_text(prompt)
 
-        if response and response.candidates:
-            json_response = response.candidates[0].content.parts[0].text.strip()
+        if json_response is not None:
             try:
                 return json.loads(json_response)  # Convert to JSON dict
             except json.JSONDecodeError:
+                metrics.inc("llm_invalid_responses_total", prompt="single")
                 return {"error": "Gemini API did not return valid JSON."}
         else:
             return {"error": "No valid response from Gemini API."}
@@ -137,17 +701,77 @@ def get_stock_recommendation(stock_name, predictions, sentiment_summary):
     except Exception as e:
         return {"error": f"Error calling Gemini API: {e}"}
 
+def get_stock_recommendations_batch(llm, items):
+    """
+    Uses one Gemini AI call to generate recommendations for several stocks.
+    items is a list of (stock_name, predictions, sentiment_summary) tuples.
+    Returns a dict keyed by stock name holding only the entries that parsed.
+    """
+    stocks_data = [
+        {"stock_name": stock_name, "predictions": predictions, "sentiment": sentiment_summary}
+        for stock_name, predictions, sentiment_summary in items
+    ]
+    prompt = (
+        f"You are a stock trading assistant helping investors make decisions.\n"
+        f"The user wants to make an investment decision for each of the following stocks.\n"
+        f"For every stock you get the price prediction for the next days and a summary of recent sentiment analysis:\n"
+        f"{json.dumps(stocks_data, default=str)}\n\n"
+        f"Based on this prediction data and sentiment, provide a recommendation for every stock. I want you to build your response on the sentiment and sentiment_reasoning field to give a description which provides an answer based on historical data and why a certain descision is being made.\n"
+        f"Return a JSON array with one object per stock in the format:\n"
+        f'[{{"stock_name": "<stock_ticker>", "action": "<buy/sell/hold>", "description": "<reasoning based on data>"}}]\n\n'
+        f"Make sure your response is only valid JSON and nothing else."
+    )
+
+    try:
+        json_response = llm.generate_text(prompt)
+        if json_response is None:
+            return {}
+        parsed = json.loads(strip_code_fence(json_response))
+    except Exception as e:
+        if isinstance(e, json.JSONDecodeError):
+            metrics.inc("llm_invalid_responses_total", prompt="batch")
+        print(f"Batched recommendation failed: {e}")
+        return {}
+
+    if not isinstance(parsed, list):
+        metrics.inc("llm_invalid_responses_total", prompt="batch")
+        return {}
+    requested = {stock_name for stock_name, _, _ in items}
+    results = {
+        entry["stock_name"]: entry
+        for entry in parsed
+        if isinstance(entry, dict) and entry.get("stock_name") in requested and entry.get("action")
+    }
+    if len(results) < len(requested):
+        metrics.inc("llm_invalid_responses_total", prompt="batch")
+    return results
+
+def strip_code_fence(text):
+    """
+    Removes a surrounding ```json ... ``` fence that Gemini sometimes adds.
+    """
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text.strip()
+
+
+def find_related_stocks(clients, ticker):
+    """
+    Returns the precomputed correlated tickers for 'ticker', or [] when none are stored.
+    """
+    with metrics.span("correlation_lookup"):
+        result = clients.collection(collection_corelation).find_one({"ticker": ticker})
+    return list(result["correlations"]) if result else []
 
 def get_sentiment_by_ticker(mongo_uri, db_name, collection, ticker):
     """
-    Fetch all sentiment data from MongoDB filtered by the given ticker.
+    Fetch a bounded sentiment summary from MongoDB for the given ticker:
+    counts per sentiment and the most recent reasoning snippets within the window.
     """
     try:
-        # Query MongoDB for all records with the given ticker
-        query = {"tikker": ticker}
-        results = list(collection.find(query, {"_id": 0}))  # Exclude _id field from results
-
-        return results
+        with metrics.span("sentiment_read"):
+            return get_sentiment_summary(collection, ticker, sentiment_window_days, sentiment_top_n)
 
     except Exception as e:
         print(f"Error retrieving data: {e}")
@@ -155,56 +779,90 @@ def get_sentiment_by_ticker(mongo_uri, db_name, collection, ticker):
     
 def get_stock_data(tickers, days=60):
     """
-    Fetches the last 'days' of stock closing price data from Yahoo Finance for multiple stocks.
-    """
-    stock_data = yf.download(tickers, period=f"{days}d", interval="1d")['Close']
-    return stock_data
-
-def predict_stock_close_price():
-    # NASDAQ100
-    tickers = ["AAPL", "ABNB", "ADBE", "ADI", "ADP", "ADSK", "AEP", "ALGN", "AMAT",
-        "AMD", "AMGN", "AMZN", "ANSS", "ASML", "AVGO", "BIDU",
-        "BIIB", "BKNG", "CDNS", "CDW", "CEG", "CHKP", "CHTR",
-        "CMCSA", "COST", "CPRT", "CRWD", "CSCO", "CSX", "CTAS", "CTSH",
-        "DDOG", "DLTR", "DOCU", "DXCM", "EA", "EBAY", "EXC", "FAST",
-        "FTNT", "FOX", "FOXA", "GILD", "GOOG", "GOOGL", "HON", "IDXX",
-        "ILMN", "INCY", "INTC", "INTU", "ISRG", "JD", "KDP", "KHC", "KLAC",
-        "LRCX", "LULU", "MAR", "MCHP", "MDLZ", "MELI", "META", "MNST",
-        "MRNA", "MRVL", "MSFT", "MTCH", "MU", "NFLX", "NTES", "NVDA", "NXPI",
-        "OKTA", "ORLY", "PANW", "PAYX", "PCAR", "PDD", "PEP", "PYPL",
-        "QCOM", "REGN", "ROST", "SBUX", "SIRI", "SNPS",
-        "SWKS", "TEAM", "TMUS", "TSLA", "TXN", "VRSK", "VRSN", "VRTX",
-        "WBA", "WDAY", "XEL", "ZM"]  
-    stock_df = get_stock_data(tickers)
-
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(stock_df)  # Scale entire dataset
-
-    # Ensure we have at least 60 days of data
-    if len(scaled_data) < 60:
-        raise ValueError("Not enough data! Model expects at least 60 time steps.")
+    Returns the last 'days' trading days of closing prices for multiple stocks.
+    Prices are read from the local price store, which only downloads the
+    trailing days it does not have yet, or from the published snapshot in snapshot mode.
+    """
+    if snapshot_reader is not None:
+        return current_snapshot().close_prices(tickers, days)
+    end = (pd.Timestamp(market_data_date()) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    # Ask for extra business days so holidays still leave 'days' full sessions
+    start = (pd.Timestamp(end) - pd.tseries.offsets.BDay(days + 10)).strftime("%Y-%m-%d")
+    with metrics.span("price_data", tickers=len(tickers)):
+        price_store.ensure(tickers, start, end)
+        return price_store.load(tickers, "Close", end=end).tail(days)
 
-    # Extract the last 60 days for prediction
-    last_60_days = scaled_data[-60:].tolist()  # Convert to list for manipulation
-    predictions_scaled = []
+def forecast_steps():
+    """
+    Steps every model forecasts: the longest of FORECAST_HORIZON and the per-ticker horizons.
+    """
+    return max([forecast_horizon, *get_model_registry().horizons.values()])
 
-    days_to_predict = 5
+def serving_data_date():
+    """
+    Market data date of the served forecasts: the published snapshot's in snapshot mode.
+    """
+    if snapshot_reader is not None:
+        return current_snapshot().data_date
+    return market_data_date()
 
-    for _ in range(days_to_predict):
-        input_data = np.reshape(last_60_days, (1, 60, len(tickers)))  # Reshape for LSTM
-        predicted_price = model.predict(input_data)  # Predict next day's prices
+def serving_version(ticker):
+    """
+    Version of the forecast that serves 'ticker', the key stored recommendations are matched on.
+    """
+    if snapshot_reader is not None:
+        snapshot = current_snapshot()
+        return snapshot.forecasts[snapshot.models.model_for(ticker)][0]
+    return forecast_version(get_model_registry().model_for(ticker))
 
-        predictions_scaled.append(predicted_price[0])  # Store scaled predictions
-        last_60_days.pop(0)  # Remove oldest day
-        last_60_days.append(predicted_price[0].tolist())  # Append predicted day
+def forecast_version(name, forecaster=None, steps=None):
+    forecaster = forecaster or get_model_registry().get(name)
+    return f"{name}-{forecaster.version}-{universe.version}-h{steps or forecast_steps()}"
 
-    predictions_actual = scaler.inverse_transform(predictions_scaled)
+def predict_stock_close_price(model_name=None, forecaster=None, steps=None):
+    """
+    Forecasts the next 'steps' (default: forecast_steps()) closes for every
+    ticker with one batched pass of the model 'model_name' (default: the
+    registry default), or of 'forecaster' when the caller resolved it already.
+    Returns a Forecast whose columns follow the model's feature order.
+    """
+    registry = get_model_registry()
+    name = model_name or registry.default
+    forecaster = forecaster or registry.get(name)
+    # A model with its own column list (the LSTM) reads those tickers, whatever the universe holds
+    tickers = getattr(forecaster, "tickers", None) or universe.tickers
+    stock_df = get_stock_data(tickers)
+    with metrics.span("inference", model=name, version=forecaster.version):
+        return forecaster.forecast(stock_df, universe, steps or forecast_steps())
 
-    # Print the predicted stock prices for the next 5 days
-    predictions_by_ticker = {ticker: [] for ticker in tickers}
+def get_forecast_cache(name):
+    """
+    Returns the forecast cache of model 'name'. Forecasts only change once per
+    trading day, so requests read them from here; after a hot swap the cache
+    is rebound to the new model version and the next read recomputes.
+    """
+    # Resolve the model once, so the version key and the computation always belong together
+    forecaster = get_model_registry().get(name)
+    steps = forecast_steps()
+    version = forecast_version(name, forecaster, steps)
+    compute_fn = lambda: predict_stock_close_price(name, forecaster, steps)
+    cache = forecast_caches.get(name)
+    if cache is None:
+        with forecast_caches_lock:
+            cache = forecast_caches.get(name)
+            if cache is None:
+                snapshot_path = None
+                if forecast_snapshot_path:
+                    root, ext = os.path.splitext(forecast_snapshot_path)
+                    snapshot_path = f"{root}.{name}{ext}"
+                cache = ForecastCache(
+                    compute_fn, version,
+                    snapshot_path=snapshot_path, snapshot_collection=forecast_snapshot_collection,
+                )
+                forecast_caches[name] = cache
+                return cache
+    if cache.model_version != version:
+        cache.bind(version, compute_fn)
+    return cache
 
-    # Organize predictions by ticker
-    for day_prices in predictions_actual:
-        for i, ticker in enumerate(tickers):
-            predictions_by_ticker[ticker].append(float(day_prices[i]))
-    return predictions_by_ticker
\ No newline at end of file
+runtime.record_timing("app_import", runtime.PROCESS_STARTED)
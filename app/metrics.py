@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Prefix of every exported metric name
+NAMESPACE = "finance_buddy"
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Print one JSON line per finished span when set
+LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "false").lower() == "true"
+
+HELP = {
+    "stage_seconds": ("histogram", "Time spent in each stage of the recommendation path."),
+    "stage_errors_total": ("counter", "Stages that raised an exception."),
+    "timeouts_total": ("counter", "Calls abandoned after their timeout."),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)."),
+    "llm_requests_total": ("counter", "LLM calls by outcome."),
+    "llm_tokens_total": ("counter", "LLM tokens by kind (prompt/completion)."),
+    "llm_invalid_responses_total": ("counter", "LLM answers that did not parse into the expected JSON."),
+    "singleflight_shared_total": ("counter", "Callers that joined in-flight work instead of starting their own."),
+    "http_request_seconds": ("histogram", "End-to-end HTTP request latency by route and status."),
+}
+
+# Registry for this process; every worker exports its own values
+_counters = {}
+_histograms = {}
+_lock = threading.Lock()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """
+    Adds 'amount' to the counter 'name' with the given labels.
+    """
+    if not amount:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    """
+    Records one observation of 'seconds' in the histogram 'name'.
+    """
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+
+def cache_lookup(cache, hits=0, misses=0):
+    inc("cache_requests_total", hits, cache=cache, result="hit")
+    inc("cache_requests_total", misses, cache=cache, result="miss")
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Times the enclosed block as 'stage'. Exceptions are counted in
+    stage_errors_total and re-raised. Extra fields only go to the span log.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        inc("stage_errors_total", stage=stage)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        observe("stage_seconds", seconds, stage=stage)
+        if LOG_SPANS:
+            line = json.dumps({"event": "span", "stage": stage, "seconds": round(seconds, 4), "error": error, **fields}, default=str)
+            # One write per line so spans from worker threads do not interleave
+            sys.stdout.write(line + "\n")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render():
+    """
+    Returns all metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+                      for key, h in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in HELP.items():
+        full_name = f"{NAMESPACE}_{name}"
+        series = counters if kind == "counter" else histograms
+        keys = sorted(key for key in series if key[0] == name)
+        if not keys:
+            continue
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for key in keys:
+            labels = key[1]
+            if kind == "counter":
+                lines.append(f"{full_name}{_labels(labels)} {counters[key]}")
+                continue
+            histogram = histograms[key]
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                cumulative += count
+                lines.append(f"{full_name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{full_name}_bucket{_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{full_name}_sum{_labels(labels)} {round(histogram['sum'], 6)}")
+            lines.append(f"{full_name}_count{_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,319 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.forecast_cache import Forecast, artifact_digest
+from app.inference import confidence_bands, create_backend, rollout, rollout_scenarios
+from app.scaler import FeatureScaler
+from app.universe import Universe
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "models.json")
+
+
+def load_feature_tickers(path):
+    """
+    Reads a model's input column order: a JSON file with a 'tickers' list.
+    """
+    with open(path) as f:
+        return list(json.load(f)["tickers"])
+
+
+class LSTMForecaster:
+    """
+    The Keras LSTM over a fixed ticker list: one input window holds every
+    ticker as a feature, so a single rollout forecasts all of them.
+
+    The columns are read from the feature file stored with the model
+    ('features_path', default '<model>.features.json'), never from the
+    universe, so tickers can be added to universe.json without changing the
+    model's input shape. Tickers outside the file get no LSTM forecast.
+
+    With 'scenarios' above 1 the window is also rolled forward that many
+    times with Gaussian noise of 'noise_scale' (in scaled units) added, as
+    one batch per step, and the forecast carries 5/50/95% bands.
+    """
+
+    kind = "lstm"
+
+    def __init__(self, path, features_path=None, scaler_path=None, backend=None, version=None,
+                 scenarios=0, noise_scale=0.01):
+        self.path = path
+        self.features_path = features_path or os.path.splitext(path)[0] + ".features.json"
+        self.scaler_path = scaler_path
+        # keras_predict, tf_function or tflite
+        self.backend_name = backend or os.getenv("INFERENCE_BACKEND", "tf_function")
+        self.scenarios = int(scenarios)
+        self.noise_scale = float(noise_scale)
+        self.version = version or artifact_digest(path, self.features_path, scaler_path or "")
+        if self.scenarios > 1 and not version:
+            self.version += f"-s{self.scenarios}n{self.noise_scale:g}"
+        self.backend = None
+        self.scaler = None
+        self.lookback = None
+        self.tickers = None
+
+    def load(self):
+        """
+        Loads the model, builds the inference backend and runs one dummy step so the first forecast is warm.
+        """
+        from tensorflow.keras.models import load_model
+
+        if not os.path.exists(self.features_path):
+            raise ValueError(f"No feature file at {self.features_path}; the LSTM needs its training column order.")
+        tickers = load_feature_tickers(self.features_path)
+        model = load_model(self.path)
+        _, lookback, features = model.input_shape
+        if len(tickers) != features:
+            raise ValueError(f"{self.features_path} lists {len(tickers)} tickers but the model takes {features} features.")
+        backend = create_backend(self.backend_name, model, self.path)
+        backend.predict(np.zeros((1, lookback, features), dtype=np.float32))
+        # Without an artifact from the training data, each input window is min-max scaled on its own
+        if self.scaler_path and os.path.exists(self.scaler_path):
+            scaler = FeatureScaler.load(self.scaler_path)
+            if not scaler.provenance:
+                print(f"Warning: ignoring {self.scaler_path}, it records no training provenance; rebuild it with "
+                      "resources/build_scaler_artifact.py. Scaling will be fitted per window.")
+            elif scaler.tickers != tickers:
+                print(f"Warning: ignoring {self.scaler_path}, its columns differ from {self.features_path}. "
+                      "Scaling will be fitted per window.")
+            else:
+                self.scaler = scaler
+        elif self.scaler_path:
+            print(f"Warning: no scaler artifact at {self.scaler_path}, scaling will be fitted per window.")
+        self.backend, self.lookback, self.tickers = backend, lookback, tickers
+
+    def forecast(self, close_df, universe, horizon):
+        model_universe = Universe(self.tickers, universe.version)
+        scaler = self.scaler or FeatureScaler.fit(close_df.tail(self.lookback), self.tickers)
+
+        # Align to the model's column order and scale
+        scaled_data, missing = scaler.prepare(close_df)
+        if missing:
+            print("Warning: no price data for ", missing, ", their forecasts are masked.")
+        if len(scaled_data) < self.lookback:
+            raise ValueError(f"Not enough data! Model expects at least {self.lookback} time steps.")
+
+        # Roll the last 'lookback' days forward one predicted day at a time
+        window = scaled_data[-self.lookback:]
+        if self.scenarios <= 1:
+            predictions_scaled = rollout(self.backend, window, horizon)[0]
+            return Forecast(model_universe, scaler.inverse_transform(predictions_scaled), masked=missing)
+        # Scenario 0 is the unperturbed window, so the point forecast is unchanged
+        scenarios = rollout_scenarios(self.backend, window, horizon, self.scenarios, self.noise_scale)
+        bands = {q: scaler.inverse_transform(band) for q, band in confidence_bands(scenarios).items()}
+        return Forecast(model_universe, scaler.inverse_transform(scenarios[0]), masked=missing, bands=bands)
+
+
+class DriftForecaster:
+    """
+    Random walk with drift: the last close plus the mean daily change over
+    'lookback' days, computed for every ticker in one vectorized pass. Cheap
+    enough to serve as a fallback when the LSTM is too slow or unavailable.
+    """
+
+    kind = "drift"
+
+    def __init__(self, lookback=20, version=None):
+        self.lookback = int(lookback)
+        self.version = version or f"lookback{self.lookback}"
+
+    def load(self):
+        pass
+
+    def forecast(self, close_df, universe, horizon):
+        values = close_df.reindex(columns=universe.tickers).ffill().to_numpy(dtype=np.float64)[-(self.lookback + 1):]
+        if len(values) < 2:
+            raise ValueError("Not enough data! The drift model needs at least two days.")
+        missing = [ticker for ticker, last in zip(universe.tickers, values[-1]) if np.isnan(last)]
+
+        changes = np.diff(values, axis=0)
+        counts = np.sum(~np.isnan(changes), axis=0)
+        drift = np.where(counts > 0, np.nansum(changes, axis=0) / np.maximum(counts, 1), 0.0)
+        steps = np.arange(1, horizon + 1, dtype=np.float64)[:, None]
+        predictions = np.nan_to_num(values[-1]) + steps * drift
+        return Forecast(universe, predictions, masked=missing)
+
+
+FORECASTERS = {"lstm": LSTMForecaster, "drift": DriftForecaster}
+# Registry entry fields holding file paths, resolved relative to the registry file
+ARTIFACT_FIELDS = ("path", "features_path", "scaler_path")
+
+
+def build_forecaster(spec):
+    """
+    Builds a forecaster from a registry entry such as {"kind": "drift", "lookback": 20}.
+    """
+    options = {key: value for key, value in spec.items() if key != "kind"}
+    if spec.get("kind") not in FORECASTERS:
+        raise ValueError(f"Unknown forecaster kind '{spec.get('kind')}', expected one of {list(FORECASTERS)}.")
+    return FORECASTERS[spec["kind"]](**options)
+
+
+class ModelRegistry:
+    """
+    Named, versioned forecasters plus the routing that picks one per ticker.
+
+    The registry file (MODEL_REGISTRY_PATH, default app/data/models.json) lists
+    the models, the default one, per-ticker routes and per-ticker horizons.
+    reload() rereads it and rebuilds only the models whose entry or artifact
+    files changed; a new version is loaded and warmed before it is swapped in,
+    so workers switch models without a restart or a cold request.
+    """
+
+    def __init__(self, path=None, fallback_config=None):
+        self.path = path
+        self.fallback_config = fallback_config or {}
+        self.default = None
+        self.routes = {}
+        self.horizons = {}
+        self._forecasters = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self._watch_thread = None
+        self._stop_event = threading.Event()
+
+    def _read_config(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                return json.load(f)
+        return self.fallback_config
+
+    def _resolve(self, spec):
+        base = os.path.dirname(os.path.abspath(self.path)) if self.path and os.path.exists(self.path) else os.getcwd()
+        return {key: os.path.join(base, value) if key in ARTIFACT_FIELDS and value else value for key, value in spec.items()}
+
+    @staticmethod
+    def _signature(spec):
+        # Entry plus artifact mtimes/sizes: cheap enough to check on every reload
+        paths = [spec[field] for field in ARTIFACT_FIELDS if spec.get(field)]
+        stats = [(path, os.path.getmtime(path), os.path.getsize(path)) for path in paths if os.path.exists(path)]
+        return json.dumps(spec, sort_keys=True), stats
+
+    def reload(self):
+        """
+        Applies the current registry file. Returns the names of models that were (re)loaded.
+        """
+        with self._lock:
+            config = self._read_config()
+            specs = {name: self._resolve(spec) for name, spec in config.get("models", {}).items()}
+            forecasters = {}
+            signatures = {}
+            changed = []
+            for name, spec in specs.items():
+                signature = self._signature(spec)
+                if self._signatures.get(name) == signature:
+                    forecasters[name] = self._forecasters[name]
+                else:
+                    forecaster = build_forecaster(spec)
+                    forecaster.load()
+                    forecasters[name] = forecaster
+                    changed.append(name)
+                signatures[name] = signature
+
+            default = config.get("default") or next(iter(specs), None)
+            if default not in forecasters:
+                raise ValueError(f"Default model '{default}' is not defined in the registry.")
+            # Readers keep using the old dict until this single assignment swaps it
+            self._forecasters, self._signatures = forecasters, signatures
+            self.default = default
+            self.routes = {ticker: name for ticker, name in config.get("routes", {}).items() if name in forecasters}
+            self.horizons = {ticker: int(horizon) for ticker, horizon in config.get("horizons", {}).items()}
+        if changed:
+            print(f"Loaded models {changed}: " + ", ".join(f"{name}={forecasters[name].version}" for name in changed))
+        return changed
+
+    def __contains__(self, name):
+        return name in self._forecasters
+
+    def names(self):
+        return list(self._forecasters)
+
+    def get(self, name=None):
+        return self._forecasters[name or self.default]
+
+    def model_for(self, ticker, requested=None):
+        """
+        The model serving 'ticker': the requested one, else its route, else the default.
+        """
+        return requested or self.routes.get(ticker, self.default)
+
+    def models_in_use(self, requested=None):
+        return [requested] if requested else list(dict.fromkeys([self.default, *self.routes.values()]))
+
+    def describe(self):
+        return {
+            "default": self.default,
+            "models": {name: {"kind": f.kind, "version": f.version} for name, f in self._forecasters.items()},
+            "routes": dict(self.routes),
+            "horizons": dict(self.horizons),
+        }
+
+    def start_watching(self, interval_seconds=60):
+        """
+        Starts a daemon thread that calls reload() every 'interval_seconds'.
+        """
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+
+        def run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Model registry reload failed: {e}")
+
+        self._stop_event.clear()
+        self._watch_thread = threading.Thread(target=run, name="model-registry", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._stop_event.set()
+
+
+class RoutedForecast:
+    """
+    Per-request view over several models' forecasts: each ticker reads the
+    forecast of the model it is routed to, trimmed to its horizon.
+    'forecasts' is {model name: (version, Forecast)}.
+    """
+
+    def __init__(self, forecasts, registry, requested=None, horizon=5, data_date=None):
+        self.forecasts = forecasts
+        self.registry = registry
+        self.requested = requested
+        self.horizon = horizon
+        # Market data date the forecasts were computed for
+        self.data_date = data_date
+
+    def model_for(self, ticker):
+        return self.registry.model_for(ticker, self.requested)
+
+    def __contains__(self, ticker):
+        entry = self.forecasts.get(self.model_for(ticker))
+        return entry is not None and ticker in entry[1]
+
+    def version_for(self, ticker):
+        return self.forecasts[self.model_for(ticker)][0]
+
+    def predictions(self, tickers):
+        """
+        Returns one list of predicted closes per ticker, selecting each model's tickers with one index vector.
+        """
+        by_model = {}
+        for ticker in tickers:
+            by_model.setdefault(self.model_for(ticker), []).append(ticker)
+        rows = {}
+        for name, group in by_model.items():
+            rows.update(zip(group, self.forecasts[name][1].select(group).T.tolist()))
+        return [rows[ticker][:self.registry.horizons.get(ticker, self.horizon)] for ticker in tickers]
+
+    def bands(self, ticker):
+        """
+        Returns {quantile: [predicted closes]} for one ticker, trimmed like
+        predictions(); empty when its model runs no scenarios.
+        """
+        horizon = self.registry.horizons.get(ticker, self.horizon)
+        bands = self.forecasts[self.model_for(ticker)][1].select_bands([ticker])
+        return {f"{q:g}": band[:horizon, 0].tolist() for q, band in bands.items()}
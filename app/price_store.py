@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import pandas as pd
+
+from app import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "prices")
+
+# How long a ticker the source returned nothing for (delisted, renamed) is not asked for again
+EMPTY_TTL_SECONDS = int(os.getenv("PRICE_EMPTY_TTL_SECONDS", str(24 * 3600)))
+
+# Calendar days re-downloaded inside the stored range on every update. Yahoo
+# rewrites past closes after a split or dividend; a stored close that no
+# longer matches the re-downloaded one gets the ticker's history rebuilt
+OVERLAP_DAYS = 7
+ADJUSTMENT_RTOL = 1e-4
+
+# One lock per ticker directory, shared by every PriceStore in the process
+_ticker_locks = {}
+_ticker_locks_guard = threading.Lock()
+
+
+class YFinanceSource:
+    """
+    Price source backed by Yahoo Finance.
+    fetch() returns a DataFrame indexed by date with (field, ticker) columns;
+    start is inclusive and end is exclusive, as in yf.download. Prices are
+    split- and dividend-adjusted as of the download, which is why PriceStore
+    re-checks an overlap with what it already holds.
+    """
+
+    def fetch(self, tickers, start, end):
+        import yfinance as yf
+
+        return yf.download(tickers, start=start, end=end, interval="1d",
+                           group_by="column", auto_adjust=True, progress=False)
+
+
+class CsvFixtureSource:
+    """
+    Offline price source reading one '<TICKER>.csv' per ticker from a directory.
+    Each file needs a Date column plus any of the OHLCV fields.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, tickers, start, end):
+        frames = {}
+        for ticker in tickers:
+            path = os.path.join(self.directory, f"{ticker}.csv")
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path, parse_dates=["Date"], index_col="Date")
+            frames[ticker] = df.loc[(df.index >= start) & (df.index < end)]
+        if not frames:
+            return pd.DataFrame()
+        # Match the yf.download layout: (field, ticker) columns
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+
+def source_from_env():
+    """
+    Uses the CSV fixture source when PRICE_FIXTURE_DIR is set, Yahoo Finance otherwise.
+    """
+    fixture_dir = os.getenv("PRICE_FIXTURE_DIR")
+    if fixture_dir:
+        return CsvFixtureSource(fixture_dir)
+    return YFinanceSource()
+
+
+class PriceStore:
+    """
+    Local daily OHLCV store with one directory per ticker holding a
+    dates.npy array, one .npy array per field and a meta.json recording which
+    date range has already been fetched. Arrays are memory-mapped on read, and
+    ensure() only asks the source for the part of a range not yet covered,
+    plus OVERLAP_DAYS of stored days to detect re-adjusted history.
+    """
+
+    def __init__(self, root=None, source=None):
+        self.root = root or os.getenv("PRICE_STORE_DIR", DEFAULT_STORE_DIR)
+        self.source = source or source_from_env()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.root, ticker)
+
+    @contextmanager
+    def _locked(self, ticker, exclusive=True):
+        """
+        Serializes access to one ticker's files: a thread lock for writers in
+        this process plus a flock on '.lock' for workers sharing the store.
+        Readers take the flock shared, so they never map a half-merged set of arrays.
+        """
+        ticker_dir = self._ticker_dir(ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        with _ticker_locks_guard:
+            thread_lock = _ticker_locks.setdefault(ticker_dir, threading.Lock())
+        with thread_lock if exclusive else nullcontext():
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(ticker_dir, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, ticker):
+        path = os.path.join(self._ticker_dir(ticker), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _read_arrays(self, ticker, mmap_mode="r"):
+        ticker_dir = self._ticker_dir(ticker)
+        dates_path = os.path.join(ticker_dir, "dates.npy")
+        if not os.path.exists(dates_path):
+            return np.array([], dtype="datetime64[D]"), {}
+        dates = np.load(dates_path, mmap_mode=mmap_mode)
+        fields = {}
+        for field in FIELDS:
+            path = os.path.join(ticker_dir, f"{field}.npy")
+            if os.path.exists(path):
+                fields[field] = np.load(path, mmap_mode=mmap_mode)
+        return dates, fields
+
+    def _write(self, ticker, dates, fields, meta):
+        ticker_dir = self._ticker_dir(ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        # Write to a unique name next to the target and rename, so readers never map a partial file
+        token = uuid.uuid4().hex
+        for name, array in [("dates", dates)] + list(fields.items()):
+            tmp_path = os.path.join(ticker_dir, f".{name}.{token}.tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, os.path.join(ticker_dir, f"{name}.npy"))
+        self._write_meta(ticker, meta)
+
+    def _write_meta(self, ticker, meta):
+        ticker_dir = self._ticker_dir(ticker)
+        tmp_path = os.path.join(ticker_dir, f".meta.{uuid.uuid4().hex}.tmp.json")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(ticker_dir, "meta.json"))
+
+    def missing_ranges(self, ticker, start, end):
+        """
+        Returns the [start, end) sub-ranges not yet fetched for a ticker, each
+        extended OVERLAP_DAYS into the fetched range so the merge can compare
+        against stored closes. Tickers the source recently had no data for are
+        skipped until EMPTY_TTL_SECONDS pass.
+        """
+        meta = self._read_meta(ticker)
+        if meta and meta.get("empty_until", 0) > time.time():
+            return []
+        if meta is None or "fetched_from" not in meta:
+            return [(start, end)]
+        ranges = []
+        if start < meta["fetched_from"]:
+            ranges.append((start, min(_shift(meta["fetched_from"], OVERLAP_DAYS), meta["fetched_until"])))
+        if end > meta["fetched_until"]:
+            ranges.append((max(_shift(meta["fetched_until"], -OVERLAP_DAYS), meta["fetched_from"]), end))
+        return ranges
+
+    def ensure(self, tickers, start, end):
+        """
+        Makes sure [start, end) is available locally for every ticker.
+        Tickers missing the same range are fetched in one batched call. A
+        ticker whose stored closes no longer match the download (split or
+        dividend since they were stored) is re-downloaded over its whole range.
+        """
+        pending = {}
+        for ticker in tickers:
+            for date_range in self.missing_ranges(ticker, start, end):
+                pending.setdefault(date_range, []).append(ticker)
+        stale = len({ticker for group in pending.values() for ticker in group})
+        metrics.cache_lookup("price_store", hits=len(tickers) - stale, misses=stale)
+
+        readjusted = self._fetch(pending)
+        if readjusted:
+            print(f"Rebuilding re-adjusted price history for {sorted(readjusted)}")
+            rebuild = {}
+            for ticker, (range_start, range_end) in readjusted.items():
+                meta = self._read_meta(ticker) or {}
+                full_range = (min(meta.get("fetched_from", range_start), range_start),
+                              max(meta.get("fetched_until", range_end), range_end))
+                rebuild.setdefault(full_range, []).append(ticker)
+            self._fetch(rebuild, replace=True)
+
+    def _fetch(self, pending, replace=False):
+        """
+        Downloads each {(start, end): tickers} group in one call and merges it.
+        Returns {ticker: (start, end)} for tickers whose stored closes no longer
+        match the download; their new rows are not merged.
+        """
+        readjusted = {}
+        for (range_start, range_end), group in pending.items():
+            print(f"Fetching prices from {range_start} to {range_end} for {len(group)} tickers...")
+            try:
+                with metrics.span("price_download", tickers=len(group)):
+                    frame = self.source.fetch(group, range_start, range_end)
+            except Exception as e:
+                print(f"Error fetching prices from {range_start} to {range_end}: {e}")
+                continue
+            for ticker in group:
+                try:
+                    with self._locked(ticker):
+                        if self._merge(ticker, frame, range_start, range_end, replace):
+                            known = readjusted.get(ticker, (range_start, range_end))
+                            readjusted[ticker] = (min(known[0], range_start), max(known[1], range_end))
+                except (OSError, ValueError) as e:
+                    print(f"Error storing prices for {ticker}: {e}")
+        return readjusted
+
+    def _merge(self, ticker, frame, range_start, range_end, replace=False):
+        """
+        Merges one ticker's rows of a downloaded frame into its arrays, or
+        replaces them when 'replace' is set. Returns True, without writing,
+        when a stored close differs from the downloaded one for the same day.
+        """
+        new_rows = pd.DataFrame()
+        if not frame.empty and ("Close", ticker) in frame.columns:
+            new_rows = frame.xs(ticker, axis=1, level=1).dropna(subset=["Close"])
+
+        # An empty download is treated as failed and left unmarked, so the next
+        # call retries it; only short empty ranges (weekends, holidays) count as
+        # fetched. A ticker missing from an otherwise non-empty batch is most
+        # likely delisted, so it is not asked for again for EMPTY_TTL_SECONDS.
+        if new_rows.empty:
+            span = pd.Timestamp(range_end) - pd.Timestamp(range_start)
+            if not frame.empty:
+                meta = self._read_meta(ticker) or {}
+                meta["empty_until"] = time.time() + EMPTY_TTL_SECONDS
+                self._write_meta(ticker, meta)
+                return False
+            if span.days > 4:
+                return False
+
+        dates, fields = (np.array([], dtype="datetime64[D]"), {}) if replace else self._read_arrays(ticker, mmap_mode=None)
+        new_dates = new_rows.index.values.astype("datetime64[D]")
+        if "Close" in fields and not new_rows.empty:
+            _, old_index, new_index = np.intersect1d(dates, new_dates, return_indices=True)
+            stored_close = fields["Close"][old_index]
+            fetched_close = new_rows["Close"].to_numpy(dtype="float64")[new_index]
+            if not np.allclose(stored_close, fetched_close, rtol=ADJUSTMENT_RTOL, equal_nan=True):
+                return True
+        all_dates = np.concatenate([dates, new_dates])
+        order = np.argsort(all_dates, kind="stable")
+        # Keep the newest copy of any date fetched twice
+        _, last_index = np.unique(all_dates[order][::-1], return_index=True)
+        keep = order[::-1][last_index]
+
+        merged = {}
+        for field in FIELDS:
+            old = fields.get(field, np.full(len(dates), np.nan))
+            new = new_rows[field].to_numpy(dtype="float64") if field in new_rows else np.full(len(new_dates), np.nan)
+            merged[field] = np.concatenate([old, new])[keep]
+
+        meta = {} if replace else self._read_meta(ticker) or {}
+        meta.pop("empty_until", None)
+        meta["fetched_from"] = min(meta.get("fetched_from", range_start), range_start)
+        meta["fetched_until"] = max(meta.get("fetched_until", range_end), range_end)
+        self._write(ticker, all_dates[keep], merged, meta)
+        return False
+
+    def load(self, tickers, field="Close", start=None, end=None):
+        """
+        Returns a DataFrame of one field for the given tickers, indexed by date.
+        Reads are served from memory-mapped arrays without touching the network.
+        """
+        columns = {}
+        for ticker in tickers:
+            if not os.path.isdir(self._ticker_dir(ticker)):
+                continue
+            with self._locked(ticker, exclusive=False):
+                dates, fields = self._read_arrays(ticker)
+            if field not in fields:
+                continue
+            columns[ticker] = pd.Series(np.asarray(fields[field]), index=pd.DatetimeIndex(dates))
+        if not columns:
+            return pd.DataFrame(columns=list(tickers))
+        df = pd.DataFrame(columns).reindex(columns=list(tickers))
+        if start is not None:
+            df = df.loc[df.index >= start]
+        if end is not None:
+            df = df.loc[df.index < end]
+        return df
+
+
+def _shift(date, days):
+    return (pd.Timestamp(date) + pd.Timedelta(days=days)).strftime("%Y-%m-%d")
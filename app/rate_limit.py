@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RateLimiter:
+    """
+    Spaces calls so at most 'requests_per_minute' start per minute across all
+    threads. None or 0 disables it.
+    """
+
+    def __init__(self, requests_per_minute=None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._local = threading.local()
+
+    def _reserve(self):
+        """
+        Books the next free slot and returns how long the caller must wait for it.
+        """
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return max(0.0, slot - now)
+
+    def wait(self):
+        # A slot already awaited with wait_async() for this call is not booked twice
+        if getattr(self._local, "prepaid", False):
+            self._local.prepaid = False
+            return
+        time.sleep(self._reserve())
+
+    async def wait_async(self):
+        """
+        Event-loop variant of wait(): the caller sleeps for its slot without holding a thread.
+        """
+        await asyncio.sleep(self._reserve())
+
+    @contextmanager
+    def prepaid(self):
+        """
+        Marks that the current thread already waited for its slot, so the next wait() returns at once.
+        """
+        self._local.prepaid = True
+        try:
+            yield
+        finally:
+            self._local.prepaid = False
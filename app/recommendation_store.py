@@ -0,0 +1,53 @@
+import time
+
+
+# Index from before several model versions were served side by side
+LEGACY_INDEX = "ticker_1_data_date_1"
+
+
+def ensure_indexes(collection):
+    """
+    One recommendation per (ticker, data_date, model_version). Drops the old
+    (ticker, data_date) unique index, which let one version overwrite another.
+    """
+    if LEGACY_INDEX in collection.index_information():
+        collection.drop_index(LEGACY_INDEX)
+    collection.create_index([("ticker", 1), ("data_date", 1), ("model_version", 1)], unique=True)
+
+
+def load_recommendations(collection, tickers, data_date, model_version):
+    """
+    Returns {ticker: recommendation} stored for 'data_date' by the same model version.
+    """
+    cursor = collection.find(
+        {"ticker": {"$in": list(tickers)}, "data_date": data_date, "model_version": model_version},
+        {"_id": 0, "ticker": 1, "recommendation": 1},
+    )
+    return {doc["ticker"]: doc["recommendation"] for doc in cursor}
+
+
+def save_recommendations(collection, recommendations, data_date, model_version):
+    """
+    Upserts {ticker: recommendation} for 'data_date' and 'model_version' in one bulk write, skipping error entries.
+    """
+    from pymongo import UpdateOne
+
+    now = time.time()
+    operations = [
+        UpdateOne(
+            {"ticker": ticker, "data_date": data_date, "model_version": model_version},
+            {"$set": {
+                "ticker": ticker,
+                "data_date": data_date,
+                "model_version": model_version,
+                "recommendation": recommendation,
+                "created_at": now,
+            }},
+            upsert=True,
+        )
+        for ticker, recommendation in recommendations.items()
+        if isinstance(recommendation, dict) and "error" not in recommendation
+    ]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    return len(operations)
@@ -0,0 +1,57 @@
+import threading
+import time
+
+# Set when the process started importing the app, used for cold-start-to-ready time
+PROCESS_STARTED = time.perf_counter()
+
+timings = {}
+errors = {}
+_loaded = {}
+_locks = {}
+_locks_guard = threading.Lock()
+_ready = threading.Event()
+
+
+def record_timing(name, started):
+    """
+    Records the seconds elapsed since 'started' (a time.perf_counter() value) under 'name'.
+    """
+    timings[name] = round(time.perf_counter() - started, 4)
+
+
+def load_once(name, loader):
+    """
+    Returns the cached result of loader(), calling it at most once per process.
+    The first call is timed and recorded under 'name'.
+    """
+    if name in _loaded:
+        return _loaded[name]
+    with _locks_guard:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _loaded:
+            started = time.perf_counter()
+            _loaded[name] = loader()
+            record_timing(name, started)
+    return _loaded[name]
+
+
+def is_loaded(name):
+    return name in _loaded
+
+
+def mark_ready():
+    record_timing("cold_start_to_ready", PROCESS_STARTED)
+    _ready.set()
+    print(f"Service ready in {timings['cold_start_to_ready']}s: {timings}")
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def status():
+    """
+    Readiness report: overall flag, per-step load timings and warm-up errors.
+    """
+    return {"ready": is_ready(), "timings": dict(timings), "errors": dict(errors)}
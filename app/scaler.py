@@ -0,0 +1,96 @@
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureScaler:
+    """
+    Min-max scaler persisted next to the model, together with the ticker ->
+    column order the model was trained on.
+
+    It reproduces MinMaxScaler(feature_range=(0, 1)). Fitted per forecast on
+    the model's input window it matches how the LSTM has always been fed; a
+    persisted artifact must come from the model's training data (see
+    resources/build_scaler_artifact.py), which 'provenance' records.
+    """
+
+    def __init__(self, tickers, data_min, data_max, fill_values=None, fitted_on=None, provenance=None):
+        self.tickers = list(tickers)
+        self.column_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.data_min = np.asarray(data_min, dtype=np.float64)
+        self.data_max = np.asarray(data_max, dtype=np.float64)
+        data_range = self.data_max - self.data_min
+        # Constant columns scale by 1, as in scikit-learn
+        self.data_range = np.where(data_range == 0, 1.0, data_range)
+        self.fill_values = np.asarray(fill_values if fill_values is not None else self.data_min, dtype=np.float64)
+        self.fitted_on = fitted_on
+        self.provenance = provenance
+
+    @classmethod
+    def fit(cls, close_df, tickers=None, provenance=None):
+        """
+        Fits on a (dates, tickers) close price DataFrame, ordered like 'tickers' if given.
+        """
+        close_df = close_df.reindex(columns=tickers) if tickers is not None else close_df
+        filled = close_df.ffill()
+        data_min = close_df.min().to_numpy(dtype=np.float64, copy=True)
+        data_max = close_df.max().to_numpy(dtype=np.float64, copy=True)
+        # Tickers without any data get an identity range and are filled at the minimum
+        empty = np.isnan(data_min)
+        data_min[empty] = 0.0
+        data_max[empty] = 1.0
+        return cls(
+            close_df.columns,
+            data_min,
+            data_max,
+            fill_values=filled.iloc[-1].fillna(pd.Series(data_min, index=close_df.columns)).to_numpy() if len(filled) else None,
+            fitted_on=str(close_df.index.max())[:10] if len(close_df) else None,
+            provenance=provenance,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            doc = json.load(f)
+        return cls(doc["tickers"], doc["data_min"], doc["data_max"], doc.get("fill_values"), doc.get("fitted_on"),
+                   doc.get("provenance"))
+
+    def save(self, path):
+        doc = {
+            "tickers": self.tickers,
+            "data_min": self.data_min.tolist(),
+            "data_max": self.data_max.tolist(),
+            "fill_values": self.fill_values.tolist(),
+            "fitted_on": self.fitted_on,
+            "provenance": self.provenance,
+            "saved_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        with open(path, "w") as f:
+            json.dump(doc, f, indent=2)
+
+    def prepare(self, close_df):
+        """
+        Aligns a close price DataFrame to the fitted ticker order and scales it.
+
+        Gaps are forward-filled; a ticker with no data at all in the window is
+        filled with its last price at fit time and reported in the returned
+        'missing' list so callers can mask its forecast.
+        Returns (scaled float32 array, missing tickers).
+        """
+        aligned = close_df.reindex(columns=self.tickers).ffill().bfill()
+        missing = [ticker for ticker in self.tickers if aligned[ticker].isna().all()]
+        values = aligned.to_numpy(dtype=np.float64)
+        if missing:
+            columns = [self.column_index[ticker] for ticker in missing]
+            values[:, columns] = self.fill_values[columns]
+        # The LSTM mixes all features, so no NaN may reach it
+        values = np.where(np.isnan(values), self.data_min, values)
+        return self.transform(values).astype(np.float32), missing
+
+    def transform(self, values):
+        return (np.asarray(values, dtype=np.float64) - self.data_min) / self.data_range
+
+    def inverse_transform(self, values):
+        return np.asarray(values, dtype=np.float64) * self.data_range + self.data_min
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+SNIPPET_CHARS = 400  # Longest sentiment_reasoning passed on to the LLM prompt
+
+
+def ensure_indexes(collection):
+    """
+    Compound (ticker, date) index backing the windowed sentiment reads.
+    """
+    collection.create_index([("ticker", 1), ("date", -1)])
+
+
+def get_sentiment_summary(collection, ticker, days=14, top_n=5):
+    """
+    Summarizes a ticker's sentiment over the last 'days' days in one server-side aggregation:
+    counts per sentiment label plus the 'top_n' most recent reasoning snippets.
+    Transfer and prompt size stay bounded however much history is stored.
+    """
+    since = (datetime.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+    pipeline = [
+        {"$match": {"ticker": ticker, "date": {"$gte": since}}},
+        {"$sort": {"date": -1}},
+        {"$facet": {
+            "counts": [{"$group": {"_id": "$sentiment", "count": {"$sum": 1}}}],
+            "snippets": [
+                {"$limit": top_n},
+                {"$project": {
+                    "_id": 0,
+                    "date": 1,
+                    "sentiment": 1,
+                    "sentiment_reasoning": {"$substrCP": ["$sentiment_reasoning", 0, SNIPPET_CHARS]},
+                }},
+            ],
+        }},
+    ]
+    result = next(collection.aggregate(pipeline), {"counts": [], "snippets": []})
+    return {
+        "ticker": ticker,
+        "since": since,
+        "counts": {entry["_id"]: entry["count"] for entry in result["counts"]},
+        "snippets": result["snippets"],
+    }
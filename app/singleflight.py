@@ -0,0 +1,64 @@
+import asyncio
+
+from app import metrics
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work on the event loop: the first caller
+    for a key starts the computation as a task, later callers for the same key
+    await that task instead of starting their own. Entries are dropped as soon
+    as the task finishes, so results are shared, not cached.
+
+    Callers await a shield of the task, so one cancelled or timed-out request
+    does not cancel the work other requests are waiting on.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}
+
+    def _start(self, key, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._inflight[key] = task
+
+        def done(finished):
+            if self._inflight.get(key) is finished:
+                del self._inflight[key]
+            if not finished.cancelled():
+                finished.exception()  # Mark as retrieved even if every caller went away
+        task.add_done_callback(done)
+        return task
+
+    def do(self, key, fn):
+        """
+        Returns an awaitable for fn()'s result (fn returns a coroutine), shared
+        with any in-flight call for 'key'.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, fn())
+        else:
+            metrics.inc("singleflight_shared_total", flight=self.name)
+        return asyncio.shield(task)
+
+    def do_many(self, keys, fn):
+        """
+        Batched variant: fn(missing_keys) returns a coroutine producing
+        {key: result} for the keys nobody else is computing yet.
+        Returns {key: awaitable} for every key.
+        """
+        keys = list(dict.fromkeys(keys))
+        missing = [key for key in keys if key not in self._inflight]
+        shared = len(keys) - len(missing)
+        if shared:
+            metrics.inc("singleflight_shared_total", shared, flight=self.name)
+        if missing:
+            batch = asyncio.ensure_future(fn(missing))
+            for key in missing:
+                self._start(key, _pick(batch, key))
+        return {key: asyncio.shield(self._inflight[key]) for key in keys}
+
+
+async def _pick(batch, key):
+    return (await batch)[key]
@@ -0,0 +1,185 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.forecast_cache import Forecast
+from app.universe import Universe
+
+# File naming the current version directory; replaced atomically on publish
+POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+
+def publish(root, data_date, close_df, forecasts, models, keep=3):
+    """
+    Writes one snapshot version under 'root' and switches the pointer file to it.
+
+    'close_df' is the daily close matrix (dates x tickers), 'forecasts' is
+    {model name: (version, Forecast)} and 'models' the registry description
+    (default, routes, horizons). Arrays are written as .npy files so readers
+    can memory-map them; the version directory is complete before the pointer
+    moves, so readers see either the old or the new snapshot, never a mix.
+    Returns the new version id.
+    """
+    os.makedirs(root, exist_ok=True)
+    snapshot_id = f"{data_date}-{time.time_ns()}"
+    tmp_dir = os.path.join(root, f".{snapshot_id}.tmp")
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, "dates.npy"), close_df.index.values.astype("datetime64[D]"))
+    np.save(os.path.join(tmp_dir, "prices.npy"), np.ascontiguousarray(close_df.to_numpy(dtype=np.float64)))
+    manifest = {
+        "id": snapshot_id,
+        "data_date": data_date,
+        "created_at": time.time(),
+        "tickers": [str(ticker) for ticker in close_df.columns],
+        "models": models,
+        "forecasts": {},
+    }
+    for name, (version, forecast) in forecasts.items():
+        file_name = f"forecast.{name}.npy"
+        np.save(os.path.join(tmp_dir, file_name), np.ascontiguousarray(forecast.values))
+        band_files = {}
+        for q, band in forecast.bands.items():
+            band_files[f"{q:g}"] = f"forecast.{name}.q{q:g}.npy"
+            np.save(os.path.join(tmp_dir, band_files[f"{q:g}"]), np.ascontiguousarray(band))
+        manifest["forecasts"][name] = {
+            "version": version,
+            "file": file_name,
+            "bands": band_files,
+            "tickers": forecast.universe.tickers,
+            "universe_version": forecast.universe.version,
+            "masked": sorted(forecast.masked),
+        }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    os.rename(tmp_dir, os.path.join(root, snapshot_id))
+
+    tmp_pointer = os.path.join(root, f"{POINTER_FILE}.tmp")
+    with open(tmp_pointer, "w") as f:
+        f.write(snapshot_id)
+    os.replace(tmp_pointer, os.path.join(root, POINTER_FILE))
+
+    _prune(root, snapshot_id, keep)
+    return snapshot_id
+
+
+def _prune(root, current_id, keep):
+    # Workers still mapping a removed version keep reading it: unlinked files live until unmapped
+    versions = sorted(
+        entry for entry in os.listdir(root)
+        if not entry.startswith(".") and os.path.isdir(os.path.join(root, entry)) and entry != current_id
+    )
+    for entry in versions[:max(len(versions) - (keep - 1), 0)]:
+        shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+class PublishedModels:
+    """
+    Routing view of the registry that produced a snapshot: the same lookups
+    as ModelRegistry without loading any model into the worker.
+    """
+
+    def __init__(self, description):
+        self.default = description.get("default")
+        self.models = description.get("models", {})
+        self.routes = description.get("routes", {})
+        self.horizons = {ticker: int(horizon) for ticker, horizon in description.get("horizons", {}).items()}
+
+    def __contains__(self, name):
+        return name in self.models
+
+    def names(self):
+        return list(self.models)
+
+    def model_for(self, ticker, requested=None):
+        return requested or self.routes.get(ticker, self.default)
+
+    def models_in_use(self, requested=None):
+        return [requested] if requested else list(dict.fromkeys([self.default, *self.routes.values()]))
+
+    def describe(self):
+        return {"default": self.default, "models": self.models, "routes": self.routes, "horizons": self.horizons}
+
+
+class Snapshot:
+    """
+    One published version, with every array memory-mapped read-only. Pages
+    are shared through the OS page cache by all workers mapping the same
+    files, so each worker pays for the mapping, not for a copy.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.id = manifest["id"]
+        self.data_date = manifest["data_date"]
+        self.created_at = manifest["created_at"]
+        self.tickers = manifest["tickers"]
+        self.models = PublishedModels(manifest["models"])
+        self.dates = np.load(os.path.join(directory, "dates.npy"), mmap_mode="r")
+        self.prices = np.load(os.path.join(directory, "prices.npy"), mmap_mode="r")
+        self.forecasts = {}
+        for name, entry in manifest["forecasts"].items():
+            values = np.load(os.path.join(directory, entry["file"]), mmap_mode="r")
+            bands = {q: np.load(os.path.join(directory, file), mmap_mode="r") for q, file in entry.get("bands", {}).items()}
+            universe = Universe(entry["tickers"], entry["universe_version"])
+            self.forecasts[name] = (entry["version"], Forecast(universe, values, masked=entry["masked"], bands=bands))
+        self._price_universe = Universe(self.tickers)
+
+    def close_prices(self, tickers, days=None):
+        """
+        Returns a (dates x tickers) DataFrame of the published closes; unknown tickers are NaN columns.
+        """
+        known = [ticker for ticker in tickers if ticker in self._price_universe]
+        rows = slice(-days, None) if days else slice(None)
+        values = self.prices[rows][:, self._price_universe.indices(known)]
+        df = pd.DataFrame(values, index=pd.DatetimeIndex(self.dates[rows]), columns=known)
+        return df.reindex(columns=list(tickers))
+
+
+class SnapshotReader:
+    """
+    Follows the pointer file under 'root' and hands out the current Snapshot.
+    The pointer is reread at most every 'check_seconds'; a new version is
+    mapped before it replaces the old one, so callers never wait on a switch
+    half-done by another thread.
+    """
+
+    def __init__(self, root, check_seconds=1.0):
+        self.root = root
+        self.check_seconds = check_seconds
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _read_pointer(self):
+        try:
+            with open(os.path.join(self.root, POINTER_FILE)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def current(self):
+        """
+        Returns the current Snapshot, or None when nothing has been published yet.
+        """
+        if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_seconds:
+            return self._snapshot
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._snapshot
+            snapshot_id = self._read_pointer()
+            if snapshot_id and (self._snapshot is None or self._snapshot.id != snapshot_id):
+                try:
+                    self._snapshot = Snapshot(os.path.join(self.root, snapshot_id))
+                    print(f"Serving snapshot {snapshot_id}")
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Ignoring unreadable snapshot {snapshot_id}: {e}")
+            self._checked_at = time.monotonic()
+            return self._snapshot
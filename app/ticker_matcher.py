@@ -0,0 +1,79 @@
+import re
+import threading
+
+from cachetools import TTLCache
+
+# Keywords mapped to the action labels the LLM prompt produces, checked in order
+ACTION_KEYWORDS = [
+    ("sell", ["sell", "selling", "dump", "exit", "get rid of"]),
+    ("hold", ["hold", "holding", "keep"]),
+    ("buy", ["buy", "buying", "invest", "investing", "purchase", "get into"]),
+    ("news", ["news", "latest", "update", "updates"]),
+]
+
+
+class TickerMatcher:
+    """
+    Resolves obvious inputs ("invest in Tesla", "should I sell AAPL?") to
+    {"ticker", "action"} without an LLM call. Returns None when the input does
+    not name exactly one known company, so the caller can fall back to the model.
+    """
+
+    def __init__(self, tickers, aliases=None):
+        aliases = aliases or {}
+        self.tickers = set(tickers)
+        # Bare symbols must be upper case (or a $cashtag) so words like "team" or "cost" don't match
+        symbols = "|".join(sorted(map(re.escape, self.tickers), key=len, reverse=True))
+        self._symbol_pattern = re.compile(rf"(?<![\w$])(?:\$(?i:{symbols})|{symbols})(?![\w-])")
+
+        self._alias_to_ticker = {}
+        for ticker, names in aliases.items():
+            if ticker in self.tickers:
+                for name in names:
+                    self._alias_to_ticker[name.lower()] = ticker
+        names = "|".join(sorted(map(re.escape, self._alias_to_ticker), key=len, reverse=True))
+        self._alias_pattern = re.compile(rf"(?<![\w])(?:{names})(?![\w-])", re.IGNORECASE) if names else None
+
+        self._action_patterns = [
+            (action, re.compile(rf"\b(?:{'|'.join(map(re.escape, words))})\b", re.IGNORECASE))
+            for action, words in ACTION_KEYWORDS
+        ]
+
+    def match(self, user_input):
+        found = {m.group(0).lstrip("$").upper() for m in self._symbol_pattern.finditer(user_input)}
+        if self._alias_pattern is not None:
+            found.update(self._alias_to_ticker[m.group(0).lower()] for m in self._alias_pattern.finditer(user_input))
+        if len(found) != 1:
+            return None
+
+        action = "analyze"
+        for label, pattern in self._action_patterns:
+            if pattern.search(user_input):
+                action = label
+                break
+        return {"ticker": found.pop(), "action": action}
+
+
+def normalize_input(user_input):
+    """
+    Normalizes user input for cache lookups: lower case, punctuation dropped, whitespace collapsed.
+    """
+    return " ".join(re.sub(r"[^\w$.'\- ]+", " ", user_input.lower()).split())
+
+
+class ExtractionCache:
+    """
+    Thread-safe LRU cache with a TTL for parsed ticker-extraction results.
+    """
+
+    def __init__(self, maxsize=4096, ttl_seconds=24 * 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+
+    def get(self, user_input):
+        with self._lock:
+            return self._cache.get(normalize_input(user_input))
+
+    def set(self, user_input, stock_details):
+        with self._lock:
+            self._cache[normalize_input(user_input)] = stock_details
@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "universe.json")
+
+
+class Universe:
+    """
+    Versioned ticker universe shared by prediction, correlation and ticker extraction.
+
+    Holds the ordered ticker list plus a ticker -> position dict, so a set of
+    tickers maps to an index vector in one step and per-ticker rows can be
+    sliced out of (days, tickers) arrays without Python loops.
+    """
+
+    def __init__(self, tickers, version="adhoc", names=None, sectors=None, aliases=None):
+        self.tickers = list(tickers)
+        self.version = version
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.names = names or {}
+        self.sectors = sectors or {}
+        self.aliases = aliases or {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            doc = json.load(f)
+        entries = doc["tickers"]
+        return cls(
+            [entry["ticker"] for entry in entries],
+            version=doc.get("version", "unversioned"),
+            names={entry["ticker"]: entry.get("name") for entry in entries},
+            sectors={entry["ticker"]: entry.get("sector") for entry in entries},
+            aliases={entry["ticker"]: entry.get("aliases", []) for entry in entries},
+        )
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def indices(self, tickers):
+        """
+        Returns the positions of 'tickers' as an int array; raises KeyError for unknown tickers.
+        """
+        return np.fromiter((self.index[ticker] for ticker in tickers), dtype=np.int64, count=len(tickers))
+
+    def in_sector(self, sector):
+        return [ticker for ticker in self.tickers if self.sectors.get(ticker) == sector]
+
+
+_universe = None
+_universe_lock = threading.Lock()
+
+
+def get_universe():
+    """
+    Returns the process-wide universe loaded from UNIVERSE_PATH (default app/data/universe.json).
+    """
+    global _universe
+    if _universe is None:
+        with _universe_lock:
+            if _universe is None:
+                _universe = Universe.load(os.getenv("UNIVERSE_PATH", DEFAULT_UNIVERSE_PATH))
+    return _universe
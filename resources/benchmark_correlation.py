@@ -0,0 +1,69 @@
+import argparse
+import time
+import tracemalloc
+
+from compute_stock_relation import compute_correlation_dict
+from correlation_engine import RollingCorrelation, compute_top_k_correlation_dict, synthetic_close_prices
+
+
+def pandas_correlation_dict(close_df, threshold=0.4):
+    """
+    The original pandas implementation of compute_correlation_dict, kept as the reference.
+    """
+    correlation_matrix = close_df.pct_change().dropna(how="all", axis=0).corr()
+    correlation_dict = {}
+    for ticker in correlation_matrix.columns:
+        correlated_series = correlation_matrix[ticker][correlation_matrix[ticker] > threshold]
+        correlation_dict[ticker] = correlated_series.drop(labels=[ticker], errors="ignore").index.tolist()
+    return correlation_dict
+
+
+def measure(fn, *args, **kwargs):
+    """
+    Runs fn once and returns (seconds, peak traced MiB).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the pandas and NumPy correlation paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--block-size", type=int, default=512)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'path':<22} {'seconds':>10} {'peak MiB':>10}")
+    for n_tickers in args.sizes:
+        close_df = synthetic_close_prices(n_tickers, args.days)
+        mismatched = sum(
+            set(expected) != set(actual)
+            for expected, actual in zip(pandas_correlation_dict(close_df).values(), compute_correlation_dict(close_df).values())
+        )
+        print(f"{n_tickers:>8} {'threshold parity':<22} {mismatched} tickers differ from pandas")
+        rows = [
+            ("pandas threshold", measure(pandas_correlation_dict, close_df, 0.4)),
+            ("numpy threshold", measure(compute_correlation_dict, close_df, 0.4)),
+            ("numpy top-k", measure(compute_top_k_correlation_dict, close_df, args.k,
+                                    block_size=args.block_size)),
+            ("numpy top-k ewm", measure(compute_top_k_correlation_dict, close_df, args.k,
+                                        halflife=20, block_size=args.block_size)),
+        ]
+
+        engine = RollingCorrelation.from_close_prices(close_df, window=60)
+        last_close = close_df.to_numpy()[-1]
+        rows.append(("rolling daily update", measure(engine.update_close, last_close * 1.01)))
+        rows.append(("rolling top-k", measure(engine.top_k, args.k, block_size=args.block_size)))
+
+        for name, (seconds, peak) in rows:
+            print(f"{n_tickers:>8} {name:<22} {seconds:>10.4f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
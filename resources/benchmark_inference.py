@@ -0,0 +1,61 @@
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.inference import BACKENDS, create_backend
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "data", "lstm_model.h5")
+
+
+def max_rss_mib():
+    """
+    Peak resident set size of this process so far (ru_maxrss is KiB on Linux).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check parity and per-step latency of the inference backends.")
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model
+
+    model = load_model(args.model_path)
+    _, timesteps, features = model.input_shape
+    inputs = np.random.default_rng(0).random((8, 1, timesteps, features), dtype=np.float32)
+    reference = np.stack([model.predict(x, verbose=0) for x in inputs])
+
+    print(f"{'backend':<15} {'max |diff|':>12} {'p50 ms':>9} {'p95 ms':>9} {'rss +MiB':>9}")
+    failed = False
+    for name in args.backends:
+        rss_before = max_rss_mib()
+        backend = create_backend(name, model, args.model_path)
+        outputs = np.stack([backend.predict(x) for x in inputs])  # Also warms up the backend
+        max_diff = float(np.max(np.abs(outputs - reference)))
+        failed |= max_diff > args.tolerance
+
+        latencies = []
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            backend.predict(inputs[i % len(inputs)])
+            latencies.append((time.perf_counter() - start) * 1000)
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(f"{name:<15} {max_diff:>12.2e} {p50:>9.3f} {p95:>9.3f} {max_rss_mib() - rss_before:>9.1f}")
+
+    if failed:
+        print(f"Parity check failed: a backend differs from model.predict by more than {args.tolerance}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
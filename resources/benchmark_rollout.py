@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.inference import BACKENDS, create_backend, rollout, rollout_scenarios
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "data", "lstm_model.h5")
+
+
+def list_rollout(backend, window, horizon):
+    """
+    The previous rollout: a Python list of rows, pop(0)/append and np.reshape every step.
+    """
+    timesteps, features = window.shape
+    last_days = window.tolist()
+    predictions = []
+    for _ in range(horizon):
+        predicted = backend.predict(np.reshape(last_days, (1, timesteps, features)))
+        predictions.append(predicted[0])
+        last_days.pop(0)
+        last_days.append(predicted[0].tolist())
+    return np.array(predictions)
+
+
+def measure(fn, *args):
+    """
+    Runs fn once and returns (milliseconds, peak traced KiB, allocated blocks).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    return elapsed, peak / 1024, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the list-based and ring-buffer rollouts.")
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--backend", default="tf_function", choices=BACKENDS)
+    parser.add_argument("--horizons", type=int, nargs="+", default=[5, 20, 60])
+    parser.add_argument("--scenarios", type=int, default=32)
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model
+
+    model = load_model(args.model_path)
+    backend = create_backend(args.backend, model, args.model_path)
+    _, timesteps, features = model.input_shape
+    window = np.random.default_rng(0).random((timesteps, features)).astype(np.float32)
+    rollout(backend, window, 1)  # Warm up the backend
+
+    parity = np.max(np.abs(list_rollout(backend, window, 5) - rollout(backend, window, 5)[0]))
+    print(f"Max |diff| between rollouts over 5 steps: {parity:.2e}")
+
+    print(f"{'horizon':>8} {'rollout':<20} {'ms':>10} {'peak KiB':>10} {'live blocks':>12}")
+    for horizon in args.horizons:
+        rows = [
+            ("list", measure(list_rollout, backend, window, horizon)),
+            ("ring buffer", measure(rollout, backend, window, horizon)),
+            (f"{args.scenarios} scenarios batched", measure(rollout_scenarios, backend, window, horizon, args.scenarios)),
+        ]
+        for name, (ms, peak, blocks) in rows:
+            print(f"{horizon:>8} {name:<20} {ms:>10.1f} {peak:>10.1f} {blocks:>12}")
+
+
+if __name__ == "__main__":
+    main()
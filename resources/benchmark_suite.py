@@ -0,0 +1,517 @@
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+# app.main resolves its model paths relative to the repository root
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPO_ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(REPO_ROOT)
+os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+
+from app.forecast_cache import market_data_date
+from app.universe import get_universe
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+SCENARIOS = ("predict", "correlation", "fetch_sentiment", "sentiment_read", "handler")
+DB_NAME = "benchmark"
+SENTIMENTS = ("positive", "negative", "neutral")
+
+
+# ---------------------------------------------------------------- fixtures
+
+def synthetic_fixtures(directory, tickers, sectors, days=300, articles_per_ticker=30, seed=0):
+    """
+    Writes deterministic price CSVs (prices/<TICKER>.csv) and Polygon-style
+    news (news.json) for 'tickers'. Returns are a market factor plus a sector
+    factor plus noise, so the correlation step has real structure to find.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=market_data_date(), periods=days)
+    market = rng.normal(0.0003, 0.01, days)
+    sector_factors = {sector: rng.normal(0, 0.008, days) for sector in sorted({sectors.get(t) for t in tickers}, key=str)}
+
+    os.makedirs(os.path.join(directory, "prices"), exist_ok=True)
+    for ticker in tickers:
+        returns = market + sector_factors[sectors.get(ticker)] + rng.normal(0, 0.012, days)
+        close = 100 * np.exp(np.cumsum(returns))
+        spread = np.abs(rng.normal(0, 0.006, days)) * close
+        pd.DataFrame(
+            {"Open": close * (1 + rng.normal(0, 0.002, days)), "High": close + spread,
+             "Low": close - spread, "Close": close, "Volume": rng.integers(1e6, 5e7, days).astype(float)},
+            index=pd.Index(dates, name="Date"),
+        ).to_csv(os.path.join(directory, "prices", f"{ticker}.csv"))
+
+    today = datetime.today()
+    news = []
+    for ticker in tickers:
+        for i in range(articles_per_ticker):
+            # Every third article also mentions another ticker, as real Polygon articles do
+            mentioned = [ticker] + ([tickers[rng.integers(len(tickers))]] if i % 3 == 0 else [])
+            published = today - timedelta(days=int(rng.integers(0, 30)), minutes=int(rng.integers(0, 1440)))
+            news.append({
+                "id": f"{ticker}-{i}",
+                "published_utc": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "insights": [
+                    {"ticker": t, "sentiment": SENTIMENTS[rng.integers(3)],
+                     "sentiment_reasoning": f"{t} " + "Analysts discussed margins, guidance and demand. " * int(rng.integers(4, 14))}
+                    for t in dict.fromkeys(mentioned)
+                ],
+            })
+    with open(os.path.join(directory, "news.json"), "w") as f:
+        json.dump(news, f)
+
+
+def record_fixtures(directory, tickers, days=300):
+    """
+    Records live prices (Yahoo Finance) and news insights (Polygon) into the
+    fixture layout, so later runs replay real data without network access.
+    """
+    from app.clients import Clients
+    from app.price_store import YFinanceSource
+
+    end = (pd.Timestamp(market_data_date()) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    start = (pd.Timestamp(end) - pd.tseries.offsets.BDay(days)).strftime("%Y-%m-%d")
+    frame = YFinanceSource().fetch(tickers, start, end)
+    os.makedirs(os.path.join(directory, "prices"), exist_ok=True)
+    for ticker in tickers:
+        columns = [field for field in ("Open", "High", "Low", "Close", "Volume") if (field, ticker) in frame.columns]
+        if columns:
+            prices = frame[[(field, ticker) for field in columns]].dropna(how="all")
+            prices.columns = columns
+            prices.rename_axis("Date").to_csv(os.path.join(directory, "prices", f"{ticker}.csv"))
+
+    clients = Clients.from_env()
+    since = (datetime.today() - timedelta(days=30)).strftime("%Y-%m-%d")
+    news = {}
+    for ticker in tickers:
+        for article in clients.polygon.list_ticker_news(ticker=ticker, published_utc_gte=since, limit=1000):
+            news[article.id] = {
+                "id": article.id,
+                "published_utc": article.published_utc,
+                "insights": [
+                    {"ticker": insight.ticker, "sentiment": insight.sentiment,
+                     "sentiment_reasoning": insight.sentiment_reasoning}
+                    for insight in (getattr(article, "insights", None) or [])
+                ],
+            }
+    with open(os.path.join(directory, "news.json"), "w") as f:
+        json.dump(list(news.values()), f)
+    clients.close()
+    print(f"Recorded {len(tickers)} price files and {len(news)} articles into {directory}")
+
+
+def rebase_fixtures(source, target):
+    """
+    Copies fixtures into 'target' with dates shifted so the newest price row is
+    the current market data date, keeping recorded fixtures usable as they age.
+    Returns the news articles.
+    """
+    os.makedirs(os.path.join(target, "prices"), exist_ok=True)
+    latest = pd.Timestamp(market_data_date())
+    shift = None
+    for name in os.listdir(os.path.join(source, "prices")):
+        prices = pd.read_csv(os.path.join(source, "prices", name), parse_dates=["Date"], index_col="Date")
+        shift = shift if shift is not None else latest - prices.index.max()
+        prices.index = pd.bdate_range(end=latest, periods=len(prices), name="Date")
+        prices.to_csv(os.path.join(target, "prices", name))
+
+    with open(os.path.join(source, "news.json")) as f:
+        news = json.load(f)
+    for article in news:
+        published = pd.Timestamp(article["published_utc"][:19]) + (shift or pd.Timedelta(0))
+        article["published_utc"] = published.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return news
+
+
+# ---------------------------------------------------------------- fake clients
+
+class FakePolygonClient:
+    """
+    Serves list_ticker_news from fixture articles after a fixed per-call latency.
+    """
+
+    def __init__(self, articles, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.by_ticker = {}
+        for article in sorted(articles, key=lambda a: a["published_utc"]):
+            for ticker in {insight["ticker"] for insight in article["insights"]}:
+                self.by_ticker.setdefault(ticker, []).append(article)
+
+    def list_ticker_news(self, ticker, published_utc_gte="", published_utc_lt="9999", order="asc", limit=1000):
+        time.sleep(self.latency_seconds)
+        for article in self.by_ticker.get(ticker, []):
+            if published_utc_gte <= article["published_utc"][:10] < published_utc_lt:
+                yield SimpleNamespace(
+                    id=article["id"],
+                    published_utc=article["published_utc"],
+                    insights=[SimpleNamespace(**insight) for insight in article["insights"]],
+                )
+
+
+class FakeGeminiClient:
+    """
+    Answers the service's three prompt types (ticker extraction, single and
+    batched recommendation) with valid JSON after a fixed per-call latency.
+    """
+
+    def __init__(self, tickers, latency_seconds=0.0):
+        self.tickers = set(tickers)
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self._symbols = re.compile(r"\b(" + "|".join(sorted(map(re.escape, tickers), key=len, reverse=True)) + r")\b")
+
+    def _recommend(self, ticker):
+        action = ("buy", "sell", "hold")[int(hashlib.md5(ticker.encode()).hexdigest(), 16) % 3]
+        return {"stock_name": ticker, "action": action, "description": f"Fixture recommendation for {ticker}."}
+
+    def generate_text(self, prompt):
+        time.sleep(self.latency_seconds)
+        self.calls += 1
+        if "Extract the NASDAQ-100" in prompt:
+            found = self._symbols.search(prompt.split("following input:", 1)[-1].upper())
+            return json.dumps({"ticker": found.group(1) if found else "AAPL", "action": "analyze"})
+        if "JSON array" in prompt:
+            names = [name for name in re.findall(r'"stock_name": "([^"]+)"', prompt) if name in self.tickers]
+            return json.dumps([self._recommend(name) for name in dict.fromkeys(names)])
+        found = re.search(r"for the stock '([^']+)'", prompt)
+        return json.dumps(self._recommend(found.group(1) if found else "AAPL"))
+
+
+def _compat_pipeline(stage):
+    # mongomock lacks $substrCP; $substr gives the same result on the ASCII fixtures
+    if isinstance(stage, dict):
+        return {("$substr" if key == "$substrCP" else key): _compat_pipeline(value) for key, value in stage.items()}
+    if isinstance(stage, list):
+        return [_compat_pipeline(value) for value in stage]
+    return stage
+
+
+class FakeCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        return self._collection.aggregate(_compat_pipeline(pipeline), *args, **kwargs)
+
+
+class FakeDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return FakeCollection(self._database[name])
+
+
+class FakeMongoClient:
+    """
+    In-process MongoDB (mongomock) exposing the subset of pymongo the service uses.
+    """
+
+    def __init__(self):
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("The benchmark suite needs mongomock for its fake MongoDB: pip install mongomock")
+        self._client = mongomock.MongoClient()
+        self.admin = SimpleNamespace(command=lambda *args, **kwargs: {"ok": 1.0})
+
+    def __getitem__(self, name):
+        return FakeDatabase(self._client[name])
+
+    def close(self):
+        pass
+
+
+class FakeClients:
+    """
+    Drop-in replacement for app.clients.Clients backed by the fakes above.
+    A real (local) MongoClient can be passed in place of the mongomock one.
+    """
+
+    def __init__(self, polygon, llm, mongo=None):
+        self.mongo = mongo or FakeMongoClient()
+        self.db = self.mongo[DB_NAME]
+        self.polygon = polygon
+        self.llm = llm
+
+    def collection(self, name):
+        return self.db[name]
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------- measurement
+
+def summarize(latencies, wall_seconds, peak_mib, **extra):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "n": len(latencies), "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "throughput_per_s": round(len(latencies) / wall_seconds, 3), "peak_mib": round(peak_mib, 2), **extra,
+    }
+
+
+def traced_peak_mib(fn):
+    """
+    Runs fn once under tracemalloc (kept out of the timed runs) and returns the peak traced MiB.
+    """
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+@contextlib.contextmanager
+def quiet():
+    # The service prints progress lines; keep them out of the report
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+def bench(fn, iterations, warmup=1):
+    with quiet():
+        for _ in range(warmup):
+            fn()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        wall = time.perf_counter() - started
+        return summarize(latencies, wall, traced_peak_mib(fn))
+
+
+def bench_handler(service, queries, concurrency):
+    """
+    Drives GET /stock_recommendation through the ASGI app with 'concurrency'
+    requests in flight. The first request (forecast computation) is reported as cold_ms.
+    """
+    import httpx
+
+    async def run():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            async def one(query):
+                start = time.perf_counter()
+                response = await client.get("/stock_recommendation", params={"user_input": query})
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+            cold = await one(queries[0])
+            gate = asyncio.Semaphore(concurrency)
+
+            async def gated(query):
+                async with gate:
+                    return await one(query)
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(gated(query) for query in queries[1:]))
+            wall = time.perf_counter() - started
+
+            tracemalloc.start()
+            await one(queries[-1])
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return summarize(latencies, wall, peak / 2**20, cold_ms=round(cold * 1000, 3), concurrency=concurrency)
+
+    with quiet():
+        return asyncio.run(run())
+
+
+def handler_queries(universe, n):
+    """
+    Mixes inputs the local ticker matcher resolves with two-ticker questions that need the LLM.
+    """
+    rng = np.random.default_rng(1)
+    tickers = universe.tickers
+    queries = []
+    for i in range(n):
+        a, b = tickers[rng.integers(len(tickers))], tickers[rng.integers(len(tickers))]
+        queries.append(f"Should I buy {a}?" if i % 2 == 0 else f"{a} or {b}, which one is the better buy? ({i})")
+    return queries
+
+
+# ---------------------------------------------------------------- baseline
+
+def environment():
+    return {
+        "python": platform.python_version(), "platform": platform.platform(),
+        "cpus": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__,
+    }
+
+
+def compare(results, baseline, max_regression, settings):
+    """
+    Prints p50/p95 changes against the baseline and returns the scenarios
+    whose p50 regressed by more than max_regression (a fraction).
+    """
+    regressed = []
+    print(f"\n{'scenario':<16} {'p50 ms':>10} {'base p50':>10} {'change':>8} {'p95 ms':>10} {'base p95':>10} {'change':>8}")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        p50_change = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        p95_change = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        print(f"{name:<16} {result['p50_ms']:>10.2f} {base['p50_ms']:>10.2f} {p50_change:>+8.1%} "
+              f"{result['p95_ms']:>10.2f} {base['p95_ms']:>10.2f} {p95_change:>+8.1%}")
+        if p50_change > max_regression:
+            regressed.append(name)
+    if baseline.get("settings") != settings:
+        print("Note: the baseline was recorded with different settings, compare with care.")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the recommendation path with fake external services.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--fixtures", help="Recorded fixture directory (default: synthetic fixtures generated per run).")
+    parser.add_argument("--record", metavar="DIR", help="Record live Yahoo Finance / Polygon data into DIR and exit.")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed iterations per scenario (predict uses a fifth).")
+    parser.add_argument("--requests", type=int, default=100, help="Requests sent to the handler.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Handler requests in flight.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Simulated Gemini latency per call.")
+    parser.add_argument("--polygon-latency-ms", type=float, default=50.0, help="Simulated Polygon latency per call.")
+    parser.add_argument("--mongo-uri", help="Use this (local) MongoDB instead of mongomock, whose pure-Python "
+                                            "aggregation dominates the sentiment timings. Database '" + DB_NAME + "' is dropped.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the new baseline.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Fail when a p50 is this much slower than the baseline.")
+    parser.add_argument("--output", help="Also write the results JSON here.")
+    args = parser.parse_args()
+
+    universe = get_universe()
+    if args.record:
+        record_fixtures(args.record, universe.tickers)
+        return
+
+    settings = {
+        key: getattr(args, key) for key in
+        ("iterations", "requests", "concurrency", "llm_latency_ms", "polygon_latency_ms")
+    }
+    settings["fixtures"] = "recorded" if args.fixtures else "synthetic"
+    settings["mongo"] = "mongodb" if args.mongo_uri else "mongomock"
+
+    workdir = tempfile.mkdtemp(prefix="finance-buddy-bench-")
+    mongo = None
+    try:
+        if args.fixtures:
+            news = rebase_fixtures(args.fixtures, os.path.join(workdir, "fixtures"))
+        else:
+            synthetic_fixtures(os.path.join(workdir, "fixtures"), universe.tickers, universe.sectors)
+            with open(os.path.join(workdir, "fixtures", "news.json")) as f:
+                news = json.load(f)
+
+        # The service reads these at import time
+        os.environ.update({
+            "PRICE_FIXTURE_DIR": os.path.join(workdir, "fixtures", "prices"),
+            "PRICE_STORE_DIR": os.path.join(workdir, "store"),
+            "DB_NAME": DB_NAME, "COLLECTION_SENTIMENT": "sentiment", "COLLECTION_CORELEATION": "correlation",
+            "COLLECTION_RECOMMENDATION": "", "COLLECTION_FORECAST": "", "FORECAST_SNAPSHOT_PATH": "",
+            "METRICS_LOG_SPANS": "false",
+        })
+        from app import main as service
+        from compute_stock_relation import compute_correlation_dict, fetch_close_prices, store_correlations_in_db
+        from sentiment_analysis import fetch_sentiment_data, store_sentiment_data
+
+        polygon = FakePolygonClient(news, args.polygon_latency_ms / 1000)
+        llm = FakeGeminiClient(universe.tickers, args.llm_latency_ms / 1000)
+        if args.mongo_uri:
+            import pymongo
+
+            mongo = pymongo.MongoClient(args.mongo_uri)
+            mongo.drop_database(DB_NAME)
+        clients = FakeClients(polygon, llm, mongo)
+        service.app.dependency_overrides[service.get_clients] = lambda: clients
+
+        # Seed the fake MongoDB the way the offline jobs do
+        end = (pd.Timestamp(market_data_date()) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        start = (pd.Timestamp(end) - pd.Timedelta(days=365)).strftime("%Y-%m-%d")
+        with quiet():
+            close_df = fetch_close_prices(universe.tickers, start, end, store=service.price_store)
+            store_correlations_in_db(compute_correlation_dict(close_df), None, DB_NAME, "correlation", client=clients.mongo)
+            store_sentiment_data(fetch_sentiment_data(polygon, universe.tickers, days=30), clients.collection("sentiment"))
+
+        results = {}
+        cycle = itertools.cycle(universe.tickers)
+        for name in args.scenarios:
+            print(f"Running {name}...")
+            if name == "predict":
+                results[name] = bench(service.predict_stock_close_price, max(1, args.iterations // 5))
+            elif name == "correlation":
+                results[name] = bench(lambda: compute_correlation_dict(close_df), args.iterations)
+            elif name == "fetch_sentiment":
+                results[name] = bench(lambda: fetch_sentiment_data(polygon, universe.tickers, days=14), max(1, args.iterations // 5))
+            elif name == "sentiment_read":
+                sample = service.get_sentiment_by_ticker(None, DB_NAME, clients.collection("sentiment"), universe.tickers[0])
+                if not sample or not sample.get("counts"):
+                    sys.exit(f"Sentiment fixture read returned nothing ({sample}); check the fixtures.")
+                results[name] = bench(
+                    lambda: service.get_sentiment_by_ticker(None, DB_NAME, clients.collection("sentiment"), next(cycle)),
+                    args.iterations * 10,
+                )
+            elif name == "handler":
+                calls_before = llm.calls
+                results[name] = bench_handler(service, handler_queries(universe, args.requests), args.concurrency)
+                results[name]["llm_calls"] = llm.calls - calls_before
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if mongo is not None:
+            mongo.drop_database(DB_NAME)
+            mongo.close()
+
+    print(f"\n{'scenario':<16} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>9} {'peak MiB':>9}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['n']:>5} {result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} "
+              f"{result['p99_ms']:>10.2f} {result['throughput_per_s']:>9.2f} {result['peak_mib']:>9.1f}")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Process max RSS: {max_rss:.0f} MiB")
+
+    report = {
+        "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), "environment": environment(),
+        "settings": settings, "max_rss_mib": round(max_rss, 1), "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressed = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressed = compare(results, json.load(f), args.max_regression, settings)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if regressed:
+        print(f"p50 regressed by more than {args.max_regression:.0%} in: {regressed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
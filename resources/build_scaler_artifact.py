@@ -0,0 +1,70 @@
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.price_store import PriceStore
+from app.models import load_feature_tickers
+from app.scaler import FeatureScaler
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "data")
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, "lstm_model.scaler.json")
+DEFAULT_FEATURES = os.path.join(DATA_DIR, "lstm_model.features.json")
+
+
+def from_training_scaler(path, tickers):
+    """
+    Converts the pickled MinMaxScaler used at training time, whose columns follow 'tickers'.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    scaler = pickle.loads(data)
+    if len(scaler.data_min_) != len(tickers):
+        raise ValueError(f"Scaler has {len(scaler.data_min_)} features but {len(tickers)} tickers were given.")
+    provenance = {"source": "training_scaler", "file": os.path.basename(path), "sha256": hashlib.sha256(data).hexdigest()}
+    return FeatureScaler(tickers, scaler.data_min_, scaler.data_max_, provenance=provenance)
+
+
+def from_training_window(start, end, tickers):
+    """
+    Fits on the closes of the model's training window [start, end).
+    """
+    store = PriceStore()
+    store.ensure(tickers, start, end)
+    close_df = store.load(tickers, "Close", start=start, end=end)
+    empty = [ticker for ticker in tickers if close_df[ticker].isna().all()]
+    if empty:
+        print("Warning: no data for ", empty)
+    return FeatureScaler.fit(close_df, tickers, provenance={"source": "training_window", "start": start, "end": end})
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the persisted min-max scaler from the LSTM's training data. Without it the "
+                    "service scales each 60-day input window on its own, as the model was fed originally; "
+                    "to use the artifact, add its path as 'scaler_path' to the model's entry in app/data/models.json."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--training-scaler", help="Pickled MinMaxScaler fitted when the model was trained.")
+    source.add_argument("--start", help="First day of the model's training window (YYYY-MM-DD).")
+    parser.add_argument("--end", help="Day after the training window (YYYY-MM-DD), required with --start.")
+    parser.add_argument("--features", default=DEFAULT_FEATURES, help="The model's feature file (column order).")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+    if args.start and not args.end:
+        parser.error("--end is required with --start")
+
+    # The scaler's columns must follow the feature order the LSTM was trained with
+    tickers = load_feature_tickers(args.features)
+    if args.training_scaler:
+        scaler = from_training_scaler(args.training_scaler, tickers)
+    else:
+        scaler = from_training_window(args.start, args.end, tickers)
+    scaler.save(args.output)
+    print(f"Saved scaler for {len(scaler.tickers)} tickers ({scaler.provenance}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,95 +1,104 @@
-import pandas as pd
-import yfinance as yf
+import os
+import sys
 import pymongo
 
-# Hardcoded NASDAQ-100 list (approx. late 2023)
-NASDAQ_100_TICKERS = [
-    "AAPL", "ABNB", "ADBE", "ADI", "ADP", "ADSK", "AEP", "ALGN", "AMAT",
-    "AMD", "AMGN", "AMZN", "ANSS", "ASML", "AVGO", "BIDU",
-    "BIIB", "BKNG", "CDNS", "CDW", "CEG", "CHKP", "CHTR",
-    "CMCSA", "COST", "CPRT", "CRWD", "CSCO", "CSX", "CTAS", "CTSH",
-    "DDOG", "DLTR", "DOCU", "DXCM", "EA", "EBAY", "EXC", "FAST",
-    "FTNT", "FOX", "FOXA", "GILD", "GOOG", "GOOGL", "HON", "IDXX",
-    "ILMN", "INCY", "INTC", "INTU", "ISRG", "JD", "KDP", "KHC", "KLAC",
-    "LRCX", "LULU", "MAR", "MCHP", "MDLZ", "MELI", "META", "MNST",
-    "MRNA", "MRVL", "MSFT", "MTCH", "MU", "NFLX", "NTES", "NVDA", "NXPI",
-    "OKTA", "ORLY", "PANW", "PAYX", "PCAR", "PDD", "PEP", "PYPL",
-    "QCOM", "REGN", "ROST", "SBUX", "SIRI", "SNPS",
-    "SWKS", "TEAM", "TMUS", "TSLA", "TXN", "VRSK", "VRSN", "VRTX",
-    "WBA", "WDAY", "XEL", "ZM"
-]
+# Share the local price store with the API package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from app.price_store import PriceStore
+from correlation_engine import compute_top_k_correlation_dict
+from app.universe import get_universe
 
-def fetch_close_prices(tickers, start_date, end_date):
+# NASDAQ-100 list from the shared universe registry (app/data/universe.json)
+NASDAQ_100_TICKERS = get_universe().tickers
+
+def fetch_close_prices(tickers, start_date, end_date, store=None):
     """
-    Fetch daily closing prices for the given tickers within [start_date, end_date] using yfinance.
+    Fetch daily closing prices for the given tickers within [start_date, end_date) from the
+    local price store, downloading only the days it does not hold yet.
     Returns a DataFrame of 'Close' prices.
     """
-    print(f"Fetching data from {start_date} to {end_date} for {len(tickers)} tickers...")
-    stock_data = yf.download(
-        tickers=tickers,
-        start=start_date,
-        end=end_date,
-        group_by="ticker"
-    )
-
-    close_df = pd.DataFrame()
-    valid_tickers = []
+    print(f"Loading data from {start_date} to {end_date} for {len(tickers)} tickers...")
+    store = store or PriceStore()
+    store.ensure(tickers, start_date, end_date)
+    close_df = store.load(tickers, "Close", start=start_date, end=end_date)
 
-    for ticker in tickers:
-        try:
-            close_df[ticker] = stock_data[ticker]['Close']
-            valid_tickers.append(ticker)
-        except KeyError:
-            print(f"Warning: No 'Close' data for {ticker}, skipping.")
+    missing = [ticker for ticker in tickers if close_df[ticker].isna().all()]
+    for ticker in missing:
+        print(f"Warning: No 'Close' data for {ticker}, skipping.")
+    close_df = close_df.drop(columns=missing)
 
-    print(f"Successfully fetched 'Close' prices for {len(valid_tickers)} / {len(tickers)} tickers.")
+    print(f"Successfully fetched 'Close' prices for {len(close_df.columns)} / {len(tickers)} tickers.")
     return close_df
 
-def compute_correlation_dict(close_df, threshold=0.4):
+def compute_correlation_dict(close_df, threshold=0.4, k=None, halflife=None):
     """
     1. Computes daily percentage returns from a 'Close' price DataFrame.
-    2. Calculates correlation matrix.
-    3. Builds and returns a dict: {ticker: [correlated tickers above threshold]}
+    2. Finds each ticker's correlated tickers with the blocked NumPy engine in correlation_engine.py.
+    3. Builds and returns a dict: {ticker: [correlated tickers above threshold]},
+       most correlated first and at most 'k' per ticker (default: no cap).
     """
-    # Compute daily returns
-    returns_df = close_df.pct_change().dropna(how="all", axis=0)
+    return compute_top_k_correlation_dict(close_df, k=k, threshold=threshold, halflife=halflife)
 
-    # Calculate correlation matrix
-    correlation_matrix = returns_df.corr()
-
-    # Build dictionary
-    correlation_dict = {}
-    for ticker in correlation_matrix.columns:
-        correlated_series = correlation_matrix[ticker][correlation_matrix[ticker] > threshold]
+def store_correlations_in_db(correlation_dict, mongo_uri, db_name, collection_name, drop_existing=False, client=None):
+    """
+    Connects to MongoDB and writes each ticker's correlations as a separate document.
 
-        # Remove the ticker itself if present
-        correlated_series = correlated_series.drop(labels=[ticker], errors='ignore')
+    By default documents are upserted on 'ticker' with one bulk_write. With
+    drop_existing=True the collection is rebuilt in a shadow collection and
+    renamed over the live one, so readers never see it empty mid-refresh.
+    Either way the collection ends up with a unique index on 'ticker'.
+    Pass an existing MongoClient as 'client' to reuse its connection pool;
+    a client created here is closed before returning.
+    """
+    owns_client = client is None
+    if owns_client:
+        client = pymongo.MongoClient(mongo_uri)
+    try:
+        _write_correlations(client[db_name], correlation_dict, collection_name, drop_existing)
+    finally:
+        if owns_client:
+            client.close()
 
-        # Convert the index to a list
-        correlation_dict[ticker] = correlated_series.index.tolist()
+def _has_unique_ticker_index(collection):
+    return any(
+        index.get("unique") and list(index["key"]) == [("ticker", pymongo.ASCENDING)]
+        for index in collection.index_information().values()
+    )
 
-    return correlation_dict
+def _write_correlations(db, correlation_dict, collection_name, drop_existing):
+    docs = [
+        {"ticker": ticker, "correlations": corr_list}
+        for ticker, corr_list in correlation_dict.items()
+    ]
 
-def store_correlations_in_db(correlation_dict, mongo_uri, db_name, collection_name, drop_existing=False):
-    """
-    Connects to MongoDB, optionally drops the existing collection, 
-    then inserts each ticker's correlations as a separate document.
-    """
-    client = pymongo.MongoClient(mongo_uri)
-    db = client[db_name]
     collection = db[collection_name]
+    if not drop_existing and collection.estimated_document_count() and not _has_unique_ticker_index(collection):
+        # Older runs appended one document per ticker on every run, so the unique
+        # index cannot be built in place: rebuild once, keeping the latest
+        # document of every ticker this run does not recompute
+        carried = {}
+        for doc in collection.find({"ticker": {"$nin": list(correlation_dict)}}, {"_id": 0}).sort("_id", pymongo.ASCENDING):
+            carried[doc["ticker"]] = doc
+        docs = list(carried.values()) + docs
+        drop_existing = True
 
     if drop_existing:
-        collection.drop()
-        print(f"Dropped existing collection: {collection_name}")
-
-    insert_count = 0
-    for ticker, corr_list in correlation_dict.items():
-        doc = {
-            "ticker": ticker,
-            "correlations": corr_list
-        }
-        collection.insert_one(doc)
-        insert_count += 1
+        shadow_name = f"{collection_name}_shadow"
+        shadow = db[shadow_name]
+        shadow.drop()
+        if docs:
+            shadow.insert_many(docs, ordered=False)
+        shadow.create_index([("ticker", pymongo.ASCENDING)], unique=True)
+        # rename with dropTarget swaps the collections atomically
+        shadow.rename(collection_name, dropTarget=True)
+        print(f"Replaced collection '{collection_name}' with {len(docs)} documents.")
+        return
 
-    print(f"Inserted {insert_count} documents into '{collection_name}' collection.")
+    collection.create_index([("ticker", pymongo.ASCENDING)], unique=True)
+    if docs:
+        result = collection.bulk_write(
+            [pymongo.UpdateOne({"ticker": doc["ticker"]}, {"$set": doc}, upsert=True) for doc in docs],
+            ordered=False
+        )
+        print(f"Upserted {result.upserted_count} and updated {result.modified_count} documents in '{collection_name}' collection.")
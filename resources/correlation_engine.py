@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+
+
+def standardize(returns, weights=None):
+    """
+    Turns a (days, tickers) return matrix without missing values into Z such
+    that Z.T @ Z is the (optionally weighted) Pearson correlation matrix.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_days = returns.shape[0]
+    if weights is None:
+        weights = np.full(n_days, 1.0 / n_days)
+    else:
+        weights = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+
+    deviations = (returns - weights @ returns) * np.sqrt(weights)[:, None]
+    norms = np.sqrt(np.einsum("ij,ij->j", deviations, deviations))
+    # Constant columns get zero correlation with everything
+    z = np.divide(deviations, norms, out=np.zeros_like(deviations), where=norms > 0)
+    return z.astype(np.float32)
+
+
+def correlation_blocks(returns, weights=None, block_size=512):
+    """
+    Yields (first row, block) pairs covering the (optionally weighted) Pearson
+    correlation matrix of a (days, tickers) return matrix, block_size rows at
+    a time, so memory stays at O(block_size * tickers) instead of O(tickers ** 2).
+
+    Like DataFrame.corr, each pair is correlated over the days both tickers
+    have a return, so gaps do not pull a ticker's correlations towards zero.
+    Without gaps a block is one product of standardized returns; with gaps
+    the sums over shared days come from masked products. Pairs with fewer
+    than two shared days or no variance on them are -inf.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_tickers = returns.shape[1]
+    valid = ~np.isnan(returns)
+    if valid.all():
+        z = standardize(returns, weights)
+        for start in range(0, n_tickers, block_size):
+            yield start, z[:, start:start + block_size].T @ z
+        return
+
+    weights = np.ones(len(returns)) if weights is None else np.asarray(weights, dtype=np.float64)
+    mask = valid.astype(np.float64)
+    filled = np.where(valid, returns, 0.0)
+    weighted_mask = mask * weights[:, None]
+    weighted = filled * weights[:, None]
+    squares = filled * filled
+    # About eight (rows, tickers) temporaries per block, so take a quarter of the rows
+    step = max(1, block_size // 4)
+    for start in range(0, n_tickers, step):
+        rows = slice(start, start + step)
+        # Weighted sums over the days rows and columns share
+        count = weighted_mask[:, rows].T @ mask
+        sum_x = weighted[:, rows].T @ mask
+        sum_y = weighted_mask[:, rows].T @ filled
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = weighted[:, rows].T @ filled - sum_x * sum_y / count
+            variance_x = (weighted[:, rows] * filled[:, rows]).T @ mask - sum_x * sum_x / count
+            variance_y = weighted_mask[:, rows].T @ squares - sum_y * sum_y / count
+            block = covariance / np.sqrt(variance_x * variance_y)
+        shared_days = mask[:, rows].T @ mask
+        defined = (shared_days >= 2) & (variance_x > 1e-18) & (variance_y > 1e-18)
+        yield start, np.where(defined, np.clip(block, -1.0, 1.0), -np.inf)
+
+
+def reduce_top_k(blocks, n_tickers, k, threshold=None):
+    """
+    Keeps the k largest entries per row of correlation row blocks given as (first row, block) pairs.
+    Returns (indices, correlations) arrays of shape (tickers, k), sorted by
+    descending correlation; entries at or below threshold, or undefined, are -1 / NaN.
+    """
+    k = min(k, n_tickers - 1)
+    indices = np.full((n_tickers, k), -1, dtype=np.int64)
+    values = np.full((n_tickers, k), np.nan, dtype=np.float32)
+    if k <= 0:
+        return indices, values
+
+    for start, block in blocks:
+        stop = start + len(block)
+        rows = np.arange(stop - start)
+        block[rows, rows + start] = -np.inf  # Exclude the ticker itself
+
+        top = np.argpartition(block, -k, axis=1)[:, -k:]
+        top_values = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_values, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_values = np.take_along_axis(top_values, order, axis=1)
+
+        below = ~np.isfinite(top_values)
+        if threshold is not None:
+            below |= top_values <= threshold
+        indices[start:stop] = np.where(below, -1, top)
+        values[start:stop] = np.where(below, np.nan, top_values)
+    return indices, values
+
+
+def threshold_neighbors(blocks, tickers, threshold):
+    """
+    Returns {ticker: [other tickers correlated above threshold]} from
+    correlation row blocks, most correlated first and without a per-ticker cap.
+    """
+    tickers = np.asarray(tickers)
+    result = {}
+    for start, block in blocks:
+        rows = np.arange(len(block))
+        block[rows, rows + start] = -np.inf  # Exclude the ticker itself
+        for offset, row in enumerate(block):
+            selected = np.flatnonzero(row > threshold)
+            selected = selected[np.argsort(-row[selected], kind="stable")]
+            result[tickers[start + offset]] = tickers[selected].tolist()
+    return result
+
+
+def neighbors_to_dict(tickers, indices):
+    """
+    Converts reduce_top_k indices into {ticker: [correlated tickers]}.
+    """
+    tickers = np.asarray(tickers)
+    return {
+        ticker: tickers[row[row >= 0]].tolist()
+        for ticker, row in zip(tickers.tolist(), indices)
+    }
+
+
+def compute_top_k_correlation_dict(close_df, k=10, threshold=None, halflife=None, block_size=512):
+    """
+    Returns {ticker: [up to k correlated tickers]}, most correlated first,
+    optionally dropping those at or below threshold and weighting recent days
+    exponentially by halflife (in days). k=None keeps every ticker above threshold.
+    """
+    returns = close_df.pct_change().dropna(how="all", axis=0).to_numpy()
+    weights = None
+    if halflife:
+        ages = np.arange(len(returns))[::-1]
+        weights = 0.5 ** (ages / halflife)
+    blocks = correlation_blocks(returns, weights, block_size)
+    if k is None:
+        return threshold_neighbors(blocks, close_df.columns, threshold if threshold is not None else -np.inf)
+    indices, _ = reduce_top_k(blocks, close_df.shape[1], k, threshold)
+    return neighbors_to_dict(close_df.columns, indices)
+
+
+class RollingCorrelation:
+    """
+    Incrementally maintained correlation over the last 'window' daily returns.
+
+    Keeps running weighted sums of returns and of their cross products, so a
+    new day is a rank-one update (add the new day, subtract the evicted one)
+    and top_k() only normalizes the sums block by block instead of multiplying
+    the whole return window again. The sums are rebuilt from the ring buffer
+    once per window to bound floating point drift. With halflife set, recent
+    days are weighted exponentially (a window-truncated EWM correlation).
+    Missing returns count as 0, i.e. an unchanged price.
+
+    Memory is O(tickers ** 2) for the cross products: about 200 MB at 5,000 tickers.
+    """
+
+    def __init__(self, tickers, window=60, halflife=None, block_size=512):
+        self.tickers = list(tickers)
+        self.block_size = block_size
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.window = window
+        self.halflife = halflife
+        # Weight of a day relative to the next one
+        self.decay = 0.5 ** (1.0 / halflife) if halflife else 1.0
+        n_tickers = len(self.tickers)
+        self._buffer = np.zeros((window, n_tickers), dtype=np.float64)
+        self._count = 0
+        self._last_close = None
+        self._weight = 0.0
+        self._sum = np.zeros(n_tickers, dtype=np.float64)
+        self._cross = np.zeros((n_tickers, n_tickers), dtype=np.float64)
+
+    @classmethod
+    def from_close_prices(cls, close_df, window=60, halflife=None):
+        engine = cls(close_df.columns, window, halflife)
+        closes = close_df.to_numpy(dtype=np.float64)[-(window + 1):]
+        if len(closes):
+            # Seed the buffer directly and build the sums once instead of one update per day
+            returns = closes[1:] / closes[:-1] - 1.0
+            engine._buffer[:len(returns)] = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+            engine._count = len(returns)
+            engine._last_close = closes[-1]
+            if len(returns):
+                engine._rebuild()
+        return engine
+
+    def update_close(self, closes):
+        """
+        Adds one day of closing prices (ordered like self.tickers).
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if self._last_close is not None:
+            self.update(closes / self._last_close - 1.0)
+        self._last_close = closes
+
+    def update(self, returns):
+        """
+        Adds one day of returns (ordered like self.tickers), evicting the oldest day.
+        Costs O(tickers ** 2), independent of the window length.
+        """
+        returns = np.nan_to_num(np.asarray(returns, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        slot = self._count % self.window
+        evicted = self._buffer[slot].copy() if self._count >= self.window else None
+        self._buffer[slot] = returns
+        self._count += 1
+
+        if self._count % self.window == 0:
+            self._rebuild()
+            return
+        # The evicted day is 'window' days old after this update
+        old_weight = self.decay ** self.window
+        self._weight = self._weight * self.decay + 1.0 - (old_weight if evicted is not None else 0.0)
+        self._sum = self._sum * self.decay + returns - (old_weight * evicted if evicted is not None else 0.0)
+        # Row blocks keep the temporaries at O(block * tickers)
+        for start in range(0, len(self.tickers), self.block_size):
+            rows = slice(start, start + self.block_size)
+            cross = self._cross[rows]
+            if self.decay != 1.0:
+                cross *= self.decay
+            if evicted is not None:
+                cross -= np.outer(old_weight * evicted[rows], evicted)
+            cross += np.outer(returns[rows], returns)
+
+    def _rebuild(self):
+        returns = self.window_returns()
+        weights = self.weights()
+        if weights is None:
+            weights = np.ones(len(returns))
+        self._weight = float(weights.sum())
+        self._sum = weights @ returns
+        self._cross = (returns * weights[:, None]).T @ returns
+
+    def window_returns(self):
+        """
+        Returns the buffered returns oldest first (a copy only when the ring has wrapped).
+        """
+        filled = min(self._count, self.window)
+        head = self._count % self.window
+        if self._count <= self.window:
+            return self._buffer[:filled]
+        return np.concatenate([self._buffer[head:], self._buffer[:head]])
+
+    def weights(self):
+        n_days = min(self._count, self.window)
+        if not self.halflife:
+            return None
+        ages = np.arange(n_days)[::-1]
+        return self.decay ** ages
+
+    def _moments(self):
+        mean = self._sum / self._weight
+        variance = np.clip(np.diagonal(self._cross) / self._weight - mean ** 2, 0.0, None)
+        std = np.sqrt(variance)
+        # Constant or empty columns get zero correlation with everything
+        inverse_std = np.divide(1.0, std, out=np.zeros_like(std), where=std > 1e-12)
+        return mean, inverse_std
+
+    def _correlation_rows(self, start, stop, mean, inverse_std):
+        correlation = self._cross[start:stop] / self._weight
+        correlation -= mean[start:stop, None] * mean
+        correlation *= inverse_std[start:stop, None]
+        correlation *= inverse_std
+        return correlation
+
+    def top_k(self, k=10, threshold=None, block_size=None):
+        """
+        Returns {ticker: [up to k most correlated tickers]} for the current window.
+        """
+        n_tickers = len(self.tickers)
+        block_size = block_size or self.block_size
+        if not self._weight:
+            return {ticker: [] for ticker in self.tickers}
+        mean, inverse_std = self._moments()
+        blocks = (
+            (start, self._correlation_rows(start, min(start + block_size, n_tickers), mean, inverse_std))
+            for start in range(0, n_tickers, block_size)
+        )
+        indices, _ = reduce_top_k(blocks, n_tickers, k, threshold)
+        return neighbors_to_dict(self.tickers, indices)
+
+    def correlation(self, ticker, other):
+        """
+        Returns the current correlation between two tickers from the running sums.
+        """
+        mean, inverse_std = self._moments()
+        i, j = self.index[ticker], self.index[other]
+        return float(self._correlation_rows(i, i + 1, mean, inverse_std)[0, j])
+
+
+def synthetic_close_prices(n_tickers, n_days=250, n_factors=10, seed=0):
+    """
+    Generates a factor-model close price DataFrame for benchmarks.
+    """
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, size=(n_days, n_factors))
+    loadings = rng.normal(0, 1, size=(n_factors, n_tickers))
+    returns = factors @ loadings + rng.normal(0, 0.01, size=(n_days, n_tickers))
+    prices = 100 * np.cumprod(1 + returns, axis=0)
+    index = pd.bdate_range(end="2025-01-31", periods=n_days)
+    return pd.DataFrame(prices, index=index, columns=[f"T{i:05d}" for i in range(n_tickers)])
@@ -1,33 +1,27 @@
 import compute_stock_relation
 import sentiment_analysis
 import predict_stock_price
-from polygon import RESTClient
-import pymongo
 import os
+import sys
 from dotenv import load_dotenv
-import google.generativeai as genai
-import os
 import json
-import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.clients import Clients
 
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 # Load environment variables from .env
 load_dotenv()
 # Retrieve sensitive data from environment variables
-polygon_api_key = os.getenv("POLYGON_API_KEY")
 mongo_uri = os.getenv("MONGO_URI")
-db_name = os.getenv("DB_NAME")
 collection_sentiment = os.getenv("COLLECTION_SENTIMENT")
 collection_corelation = os.getenv("COLLECTION_CORELEATION")
-llm_api_key = os.getenv("LLM_API_KEY")
-# Initialize Polygon Client
-client = RESTClient(api_key=polygon_api_key)
-# Initialize MongoDB Client
-client1 = pymongo.MongoClient(mongo_uri)
-db = client1[db_name]
-collection_sentiment_db = db[collection_sentiment]
-collection_corelation_db = db[collection_corelation]
-genai.configure(api_key=llm_api_key)
+# One pooled MongoDB / Polygon / Gemini client set for the whole run; Gemini calls
+# are paced by LLM_REQUESTS_PER_MINUTE instead of a fixed sleep
+clients = Clients.from_env()
+db = clients.db
+collection_sentiment_db = clients.collection(collection_sentiment)
+collection_corelation_db = clients.collection(collection_corelation)
 
 def get_stock_details(user_input):
     prompt = (
@@ -45,11 +39,9 @@ def get_stock_details(user_input):
     )
 
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
+        json_response = clients.llm.generate_text(prompt)
 
-        if response and response.candidates:
-            json_response = response.candidates[0].content.parts[0].text.strip()
+        if json_response is not None:
             return json_response  # Returns JSON as a string
         else:
             return "Error: No valid response from Gemini API."
@@ -81,11 +73,9 @@ def get_stock_recommendation(stock_name, predictions, sentiment_summary):
     )
 
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
+        json_response = clients.llm.generate_text(prompt)
 
-        if response and response.candidates:
-            json_response = response.candidates[0].content.parts[0].text.strip()
+        if json_response is not None:
             try:
                 return json.loads(json_response)  # Convert to JSON dict
             except json.JSONDecodeError:
@@ -121,10 +111,16 @@ print("related stocks = ",related_stocks)
 
 
 
+# One forecast run covers every ticker of the default model
+forecast = predict_stock_price.predict_stock_close_price()
+
 # Fetch sentiment data and predicted stock price
 for trikker in related_stocks:
     # Fetch and store predicted price for trikker
-    predicted_closing_rate[trikker] = predict_stock_price.predict_stock_close_price(trikker)
+    if trikker not in forecast:
+        print(f"No price forecast available for {trikker}, skipping.")
+        continue
+    predicted_closing_rate[trikker] = forecast[trikker]
 
     # Fetch and store sentiment analysis results
     sentiment_analysis_results[trikker] = sentiment_analysis.get_sentiment_by_ticker(
@@ -142,4 +138,5 @@ for stock in predicted_closing_rate.keys():
     recommendation = get_stock_recommendation(stock, predicted_closing_rate[stock], sentiment_analysis_results[stock])
     print(json.dumps(recommendation, indent=4))
     print("-" * 50)
-    time.sleep(5)
\ No newline at end of file
+
+clients.close()
\ No newline at end of file
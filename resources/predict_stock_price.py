@@ -1,63 +1,33 @@
-import numpy as np
-import yfinance as yf
-from tensorflow.keras.models import load_model
-from sklearn.preprocessing import MinMaxScaler
+import os
+import sys
+import pandas as pd
 
-MODEL_PATH = "./data/lstm_model.h5"  # Change this to your actual model path
-model = load_model(MODEL_PATH)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.forecast_cache import market_data_date
+from app.models import DEFAULT_REGISTRY_PATH, ModelRegistry
+from app.price_store import PriceStore
+from app.universe import get_universe
+
+# Same registry file as the API (MODEL_REGISTRY_PATH, default app/data/models.json)
+registry = ModelRegistry(os.getenv("MODEL_REGISTRY_PATH", DEFAULT_REGISTRY_PATH))
+registry.reload()
 
 def get_stock_data(tickers, days=60):
     """
-    Fetches the last 'days' of stock closing price data from Yahoo Finance for multiple stocks.
+    Returns the last 'days' trading days of closing prices for multiple stocks from the local price store.
     """
-    stock_data = yf.download(tickers, period=f"{days}d", interval="1d")['Close']
-    return stock_data
+    end = (pd.Timestamp(market_data_date()) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    start = (pd.Timestamp(end) - pd.tseries.offsets.BDay(days + 10)).strftime("%Y-%m-%d")
+    store = PriceStore()
+    store.ensure(tickers, start, end)
+    return store.load(tickers, "Close", end=end).tail(days)
 
-def predict_stock_close_price():
-    # NASDAQ100
-    tickers = ["AAPL", "ABNB", "ADBE", "ADI", "ADP", "ADSK", "AEP", "ALGN", "AMAT",
-        "AMD", "AMGN", "AMZN", "ANSS", "ASML", "AVGO", "BIDU",
-        "BIIB", "BKNG", "CDNS", "CDW", "CEG", "CHKP", "CHTR",
-        "CMCSA", "COST", "CPRT", "CRWD", "CSCO", "CSX", "CTAS", "CTSH",
-        "DDOG", "DLTR", "DOCU", "DXCM", "EA", "EBAY", "EXC", "FAST",
-        "FTNT", "FOX", "FOXA", "GILD", "GOOG", "GOOGL", "HON", "IDXX",
-        "ILMN", "INCY", "INTC", "INTU", "ISRG", "JD", "KDP", "KHC", "KLAC",
-        "LRCX", "LULU", "MAR", "MCHP", "MDLZ", "MELI", "META", "MNST",
-        "MRNA", "MRVL", "MSFT", "MTCH", "MU", "NFLX", "NTES", "NVDA", "NXPI",
-        "OKTA", "ORLY", "PANW", "PAYX", "PCAR", "PDD", "PEP", "PYPL",
-        "QCOM", "REGN", "ROST", "SBUX", "SIRI", "SNPS",
-        "SWKS", "TEAM", "TMUS", "TSLA", "TXN", "VRSK", "VRSN", "VRTX",
-        "WBA", "WDAY", "XEL", "ZM"]  
+def predict_stock_close_price(model_name=None, days_to_predict=5):
+    """
+    Forecasts the next 'days_to_predict' closes of every ticker with the registered model 'model_name' (default: the registry default).
+    """
+    universe = get_universe()
+    forecaster = registry.get(model_name)
+    tickers = getattr(forecaster, "tickers", None) or universe.tickers
     stock_df = get_stock_data(tickers)
-
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(stock_df)  # Scale entire dataset
-
-    # Ensure we have at least 60 days of data
-    if len(scaled_data) < 60:
-        raise ValueError("Not enough data! Model expects at least 60 time steps.")
-
-    # Extract the last 60 days for prediction
-    last_60_days = scaled_data[-60:].tolist()  # Convert to list for manipulation
-    predictions_scaled = []
-
-    days_to_predict = 5
-
-    for _ in range(days_to_predict):
-        input_data = np.reshape(last_60_days, (1, 60, len(tickers)))  # Reshape for LSTM
-        predicted_price = model.predict(input_data)  # Predict next day's prices
-
-        predictions_scaled.append(predicted_price[0])  # Store scaled predictions
-        last_60_days.pop(0)  # Remove oldest day
-        last_60_days.append(predicted_price[0].tolist())  # Append predicted day
-
-    predictions_actual = scaler.inverse_transform(predictions_scaled)
-
-    # Print the predicted stock prices for the next 5 days
-    predictions_by_ticker = {ticker: [] for ticker in tickers}
-
-    # Organize predictions by ticker
-    for day_prices in predictions_actual:
-        for i, ticker in enumerate(tickers):
-            predictions_by_ticker[ticker].append(float(day_prices[i]))
-    return predictions_by_ticker
\ No newline at end of file
+    return forecaster.forecast(stock_df, universe, days_to_predict).by_ticker()
@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import time
+
+# app.main resolves its model paths relative to the repository root
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Single producer for multi-worker serving: computes the daily price matrix and every "
+                    "model's forecast, and publishes them as a memory-mapped snapshot that API workers "
+                    "started with SNAPSHOT_DIR read without loading any model. Example: "
+                    "'python resources/publish_snapshots.py --snapshot-dir /dev/shm/finance-buddy' next to "
+                    "'SNAPSHOT_DIR=/dev/shm/finance-buddy uvicorn app.main:app --workers 4'."
+    )
+    parser.add_argument("--snapshot-dir", default=os.getenv("SNAPSHOT_DIR"),
+                        help="Where to publish (default: SNAPSHOT_DIR). A tmpfs such as /dev/shm keeps it in memory.")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("FORECAST_REFRESH_SECONDS", "900")),
+                        help="Seconds between checks for a new market data date or model version.")
+    parser.add_argument("--price-days", type=int, default=60, help="Trading days of closes to publish.")
+    parser.add_argument("--keep", type=int, default=3, help="Snapshot versions to keep on disk.")
+    parser.add_argument("--once", action="store_true", help="Publish once and exit.")
+    parser.add_argument("--force", action="store_true", help="Publish even if nothing changed.")
+    args = parser.parse_args()
+    if not args.snapshot_dir:
+        parser.error("--snapshot-dir or SNAPSHOT_DIR is required")
+    return args
+
+
+def publish_if_changed(service, snapshot_dir, price_days, keep, force=False):
+    """
+    Publishes a new snapshot when the market data date or any model version
+    differs from the current one. Returns the new snapshot id, or None.
+    """
+    from app.forecast_cache import market_data_date
+    from app.snapshot import SnapshotReader, publish
+
+    registry = service.get_model_registry()
+    registry.reload()
+    data_date = market_data_date()
+    versions = {name: service.forecast_version(name) for name in registry.names()}
+
+    current = SnapshotReader(snapshot_dir, check_seconds=0).current()
+    if current and not force and current.data_date == data_date and \
+            {name: version for name, (version, _) in current.forecasts.items()} == versions:
+        return None
+
+    started = time.perf_counter()
+    close_df = service.get_stock_data(service.universe.tickers, days=price_days)
+    forecasts = {name: (versions[name], service.predict_stock_close_price(name)) for name in registry.names()}
+    snapshot_id = publish(snapshot_dir, data_date, close_df, forecasts, registry.describe(), keep=keep)
+    print(f"Published snapshot {snapshot_id} ({', '.join(versions.values())}) in {time.perf_counter() - started:.1f}s")
+    return snapshot_id
+
+
+def main():
+    args = parse_args()
+    # This process computes the forecasts; SNAPSHOT_DIR would put app.main in read-only snapshot mode
+    os.environ.pop("SNAPSHOT_DIR", None)
+    from app import main as service
+
+    while True:
+        try:
+            publish_if_changed(service, args.snapshot_dir, args.price_days, args.keep, force=args.force)
+        except Exception as e:
+            if args.once:
+                raise
+            print(f"Snapshot publish failed: {e}")
+        if args.once:
+            break
+        args.force = False
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
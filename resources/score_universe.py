@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# app.main resolves its model paths relative to the repository root
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+from app import main as service
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score the whole ticker universe and store the recommendations for the API to serve."
+    )
+    parser.add_argument("--tickers", nargs="+", help="Only score these tickers (default: the whole universe).")
+    parser.add_argument("--reuse", action="store_true", help="Keep recommendations already stored for today.")
+    args = parser.parse_args()
+
+    if not service.collection_recommendation:
+        print("Warning: COLLECTION_RECOMMENDATION is not set, results will only be printed.")
+
+    start = time.perf_counter()
+    results = asyncio.run(service.score_universe(args.tickers, use_stored=args.reuse))
+    elapsed = time.perf_counter() - start
+
+    failed = [ticker for ticker, result in results.items() if not isinstance(result, dict) or "error" in result]
+    for ticker, result in sorted(results.items()):
+        print(f"{ticker}: {result}")
+    print(f"Scored {len(results)} tickers in {elapsed:.1f}s ({len(failed)} failed: {failed})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,131 @@
-import pandas as pd
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from pymongo import ASCENDING, UpdateOne
 
-def fetch_sentiment_data(client, company_tickers, days=5):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.rate_limit import RateLimiter
+from app.sentiment_store import ensure_indexes, get_sentiment_summary
+
+ARTICLE_INDEX = "article_id_1_ticker_1"
+
+
+def fetch_ticker_sentiment(client, ticker, start_date, end_date, rate_limiter=None):
     """
-    Fetches news sentiment data for a list of stock tickers from Polygon.io.
+    Fetches news sentiment insights for one ticker over [start_date, end_date] with a single
+    date-range query. The Polygon client follows result pages lazily.
     """
-    # Initialize Polygon.io client
+    if rate_limiter:
+        rate_limiter.wait()
+    # published_utc_lt the day after end_date so articles from the whole last day are included
+    until = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
     sentiment_data = []
+    for article in client.list_ticker_news(
+        ticker=ticker, published_utc_gte=start_date, published_utc_lt=until, order="asc", limit=1000
+    ):
+        if not (hasattr(article, "insights") and article.insights):
+            continue
+        for insight in article.insights:
+            # Articles carry insights for every ticker they mention; keep the one for this ticker
+            if getattr(insight, "ticker", ticker) != ticker:
+                continue
+            sentiment_data.append({
+                "article_id": article.id,
+                "date": article.published_utc[:10],
+                "sentiment": insight.sentiment,
+                "sentiment_reasoning": insight.sentiment_reasoning,
+                "ticker": ticker
+            })
+    return sentiment_data
+
 
+def iter_sentiment_data(client, company_tickers, days=5, max_workers=8, requests_per_minute=None):
+    """
+    Streams news sentiment data for a list of stock tickers from Polygon.io.
+    Tickers are queried concurrently, one date-range query each, and entries are
+    yielded as soon as a ticker completes.
+    """
     # Define date range
     end_date = (datetime.today() - timedelta(days=2)).strftime('%Y-%m-%d')  # Yesterday
     start_date = (datetime.today() - timedelta(days=days)).strftime('%Y-%m-%d')  # Past 'days' days
+    rate_limiter = RateLimiter(requests_per_minute)
 
-    for ticker in company_tickers:
-        for day in pd.date_range(start=start_date, end=end_date):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_ticker_sentiment, client, ticker, start_date, end_date, rate_limiter): ticker
+            for ticker in company_tickers
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
             try:
-                # Fetch news articles for the given date
-                daily_news = list(client.list_ticker_news(ticker=ticker, published_utc=day.strftime("%Y-%m-%d"), limit=100))
-                
-                # Extract sentiment insights from articles
-                for article in daily_news:
-                    if hasattr(article, 'insights') and article.insights:
-                        for insight in article.insights:
-                            sentiment_entry = {
-                                "date": day.strftime("%Y-%m-%d"),
-                                "sentiment": insight.sentiment,
-                                "sentiment_reasoning": insight.sentiment_reasoning,
-                                "ticker": ticker
-                            }
-                            sentiment_data.append(sentiment_entry)
-
-                print(f"Processed sentiment data for {ticker} on {day.strftime('%Y-%m-%d')}")
-
+                ticker_data = future.result()
             except Exception as e:
-                print(f"Error processing {ticker} on {day.strftime('%Y-%m-%d')}: {e}")
+                print(f"Error processing {ticker} from {start_date} to {end_date}: {e}")
+                continue
+            print(f"Processed sentiment data for {ticker} from {start_date} to {end_date}")
+            yield from ticker_data
 
-    return sentiment_data
 
-def get_sentiment_by_ticker(mongo_uri, db_name, collection, ticker):
+def fetch_sentiment_data(client, company_tickers, days=5, max_workers=8, requests_per_minute=None):
     """
-    Fetch all sentiment data from MongoDB filtered by the given ticker.
+    Fetches news sentiment data for a list of stock tickers from Polygon.io.
     """
-    try:
-        # Query MongoDB for all records with the given ticker
-        query = {"tikker": ticker}
-        results = list(collection.find(query, {"_id": 0}))  # Exclude _id field from results
+    return list(iter_sentiment_data(client, company_tickers, days, max_workers, requests_per_minute))
+
 
-        return results
+def ensure_article_index(collection):
+    """
+    Unique (article_id, ticker) index. Older entries were stored without an
+    article_id, so the index only covers documents that have one; otherwise
+    those legacy rows would all index as null and collide.
+    """
+    index = collection.index_information().get(ARTICLE_INDEX)
+    if index is not None and "partialFilterExpression" not in index:
+        collection.drop_index(ARTICLE_INDEX)
+    collection.create_index(
+        [("article_id", ASCENDING), ("ticker", ASCENDING)],
+        name=ARTICLE_INDEX,
+        unique=True,
+        partialFilterExpression={"article_id": {"$exists": True}},
+    )
+
+
+def store_sentiment_data(sentiment_data, collection, batch_size=500):
+    """
+    Bulk-upserts sentiment entries (any iterable, e.g. iter_sentiment_data) into MongoDB.
+    Entries are deduplicated on (article_id, ticker), so re-running an ingestion is idempotent.
+    """
+    ensure_article_index(collection)
+    ensure_indexes(collection)
+
+    upsert_count = 0
+    batch = []
+    for entry in sentiment_data:
+        batch.append(UpdateOne(
+            {"article_id": entry["article_id"], "ticker": entry["ticker"]},
+            {"$set": entry},
+            upsert=True
+        ))
+        if len(batch) >= batch_size:
+            collection.bulk_write(batch, ordered=False)
+            upsert_count += len(batch)
+            batch = []
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+        upsert_count += len(batch)
+
+    print(f"Upserted {upsert_count} sentiment entries into '{collection.name}' collection.")
+    return upsert_count
+
+def get_sentiment_by_ticker(mongo_uri, db_name, collection, ticker, days=14, top_n=5):
+    """
+    Fetch a bounded sentiment summary from MongoDB for the given ticker:
+    counts per sentiment and the most recent reasoning snippets within the window.
+    """
+    try:
+        return get_sentiment_summary(collection, ticker, days, top_n)
 
     except Exception as e:
         print(f"Error retrieving data: {e}")
         return []
-
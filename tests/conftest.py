@@ -0,0 +1,195 @@
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MODEL_PATH = os.path.join(REPO_ROOT, "app", "data", "lstm_model.h5")
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "resources"))
+
+# app.main reads its configuration at import time; point it at local fixtures only
+_fixture_dir = tempfile.mkdtemp(prefix="finance-buddy-tests-")
+os.environ.setdefault("PRICE_STORE_DIR", os.path.join(_fixture_dir, "prices"))
+os.environ.setdefault("PRICE_FIXTURE_DIR", os.path.join(_fixture_dir, "csv"))
+os.environ.setdefault("DB_NAME", "finance_buddy_test")
+os.environ.setdefault("COLLECTION_SENTIMENT", "sentiment")
+os.environ.setdefault("COLLECTION_CORELEATION", "correlation")
+os.environ.setdefault("MODEL_RELOAD_SECONDS", "0")
+
+
+def _accept_bulk_sort():
+    """
+    pymongo 4.11 passes 'sort' (None unless set) from UpdateOne/ReplaceOne to
+    the bulk builder, which mongomock 4.3 does not accept yet. Drop it there.
+    """
+    try:
+        from mongomock.collection import BulkOperationBuilder
+    except ImportError:
+        return
+    for name in ("add_update", "add_replace"):
+        method = getattr(BulkOperationBuilder, name)
+        if "sort" in inspect.signature(method).parameters:
+            continue
+
+        def without_sort(self, *args, _method=method, sort=None, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock does not support sorted bulk writes")
+            return _method(self, *args, **kwargs)
+
+        setattr(BulkOperationBuilder, name, without_sort)
+
+
+_accept_bulk_sort()
+
+
+def write_price_fixtures(directory, tickers, days=120, seed=0):
+    """
+    One synthetic '<TICKER>.csv' of daily closes per ticker, ending yesterday.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=1), periods=days)
+    for ticker in tickers:
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.01, size=days))
+        pd.DataFrame({"Date": dates, "Close": close}).to_csv(os.path.join(directory, f"{ticker}.csv"), index=False)
+
+
+def prompt_tickers(prompt):
+    """
+    Tickers a recommendation prompt asks about: the JSON list of a batched
+    prompt, or the quoted name of a single one.
+    """
+    if "JSON array" in prompt:
+        return [item["stock_name"] for item in json.loads(prompt.split("sentiment analysis:\n")[1].split("\n\n")[0])]
+    if "stock '" in prompt:
+        return [prompt.split("stock '")[1].split("'")[0]]
+    return []
+
+
+def extraction_input(prompt):
+    """
+    The user input a ticker extraction prompt asks about, or None for other prompts.
+    """
+    if "Extract the NASDAQ-100" not in prompt:
+        return None
+    return prompt.split("following input: '")[1].rsplit("'", 1)[0]
+
+
+def closes(tickers, days=80, seed=0):
+    """
+    Random-walk closes for 'tickers' over 'days' business days ending 2025-01-02.
+    """
+    rng = np.random.default_rng(seed)
+    values = 100 * np.cumprod(1 + rng.normal(0, 0.01, size=(days, len(tickers))), axis=0)
+    return pd.DataFrame(values, index=pd.bdate_range(end="2025-01-02", periods=days), columns=tickers)
+
+
+class PersistenceBackend:
+    """
+    Inference backend predicting that tomorrow repeats the last row of the window.
+    """
+
+    def predict(self, inputs):
+        return np.asarray(inputs)[:, -1]
+
+
+class FakeLLM:
+    """
+    Stand-in for GeminiClient.generate_text: answers recommendation prompts
+    with valid JSON after 'delay' seconds. 'delays' overrides the delay per
+    ticker, 'drop' leaves tickers out of batched answers and 'invalid' makes
+    batched answers unparsable. Extraction prompts are answered with the
+    'tickers' entry for their input. Like GeminiClient, every call first
+    waits on a RateLimiter of 'requests_per_minute'.
+    """
+
+    def __init__(self, delay=0.0, delays=None, drop=(), invalid=False, tickers=None, requests_per_minute=None):
+        from app.rate_limit import RateLimiter
+
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.tickers = tickers or {}
+        self.delay = delay
+        self.delays = delays or {}
+        self.drop = set(drop)
+        self.invalid = invalid
+        self.prompts = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_text(self, prompt):
+        self.rate_limiter.wait()
+        tickers = prompt_tickers(prompt)
+        with self._lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(max([self.delay] + [self.delays.get(ticker, 0.0) for ticker in tickers]))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        user_input = extraction_input(prompt)
+        if user_input is not None:
+            return json.dumps({"ticker": self.tickers.get(user_input), "action": "buy"})
+        if "JSON array" in prompt:
+            if self.invalid:
+                return "Sorry, I cannot help with that."
+            return json.dumps([
+                {"stock_name": ticker, "action": "hold", "description": "batched"}
+                for ticker in tickers if ticker not in self.drop
+            ])
+        return json.dumps({"stock_name": tickers[0], "action": "buy", "description": "single"})
+
+
+class FakeClients:
+    """
+    Clients replacement backed by a mongomock database and a FakeLLM.
+    """
+
+    def __init__(self, db, llm):
+        self.db = db
+        self.llm = llm
+
+    def collection(self, name):
+        return self.db[name]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope="session")
+def service():
+    from app import main
+
+    write_price_fixtures(os.environ["PRICE_FIXTURE_DIR"], main.universe.tickers)
+    return main
+
+
+@pytest.fixture
+def mongo_db():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient()["finance_buddy_test"]
+
+
+@pytest.fixture
+def fake_forecast(service):
+    """
+    RoutedForecast over a constant fake model, so no TensorFlow model is loaded.
+    """
+    from app.forecast_cache import Forecast
+    from app.snapshot import PublishedModels
+    from app.models import RoutedForecast
+
+    universe = service.universe
+    values = np.tile(np.arange(1.0, 6.0)[:, None], (1, len(universe)))
+    registry = PublishedModels({"default": "fake", "models": {"fake": {"kind": "fake", "version": "1"}}})
+    return RoutedForecast({"fake": ("fake-1", Forecast(universe, values))}, registry, data_date="2025-01-02")
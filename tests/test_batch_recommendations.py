@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import FakeClients, FakeLLM, prompt_tickers
+
+STOCKS = ["AAPL", "NVDA", "MSFT", "AMZN"]
+PREDICTIONS = [[1.0, 2.0]] * len(STOCKS)
+SENTIMENTS = [{"average_sentiment": 0.1, "summary": "steady"}] * len(STOCKS)
+
+
+def recommend(service, llm):
+    return asyncio.run(service.recommend_batch(llm, STOCKS, PREDICTIONS, SENTIMENTS))
+
+
+def test_batch_is_one_llm_call(service):
+    llm = FakeLLM()
+
+    results = recommend(service, llm)
+
+    assert len(llm.prompts) == 1
+    assert prompt_tickers(llm.prompts[0]) == STOCKS
+    assert [result["stock_name"] for result in results] == STOCKS
+    assert all(result["description"] == "batched" for result in results)
+
+
+def test_tickers_missing_from_batch_fall_back_to_single_calls(service):
+    llm = FakeLLM(drop={"NVDA"})
+
+    results = {result["stock_name"]: result for result in recommend(service, llm)}
+
+    assert len(llm.prompts) == 2
+    assert prompt_tickers(llm.prompts[1]) == ["NVDA"]
+    assert results["NVDA"]["description"] == "single"
+    assert all(results[ticker]["description"] == "batched" for ticker in ["AAPL", "MSFT", "AMZN"])
+
+
+def test_unparsable_batch_falls_back_for_every_ticker(service):
+    llm = FakeLLM(invalid=True)
+
+    results = recommend(service, llm)
+
+    assert len(llm.prompts) == 1 + len(STOCKS)
+    assert [result["stock_name"] for result in results] == STOCKS
+    assert all(result["description"] == "single" for result in results)
+
+
+def test_batch_timeout_marks_every_ticker(service, monkeypatch):
+    monkeypatch.setattr(service, "llm_timeout_seconds", 0.1)
+
+    results = recommend(service, FakeLLM(delay=0.5))
+
+    assert [result["stock_name"] for result in results] == STOCKS
+    assert all("error" in result for result in results)
+
+
+@pytest.fixture
+def client(service, mongo_db, fake_forecast, monkeypatch):
+    mongo_db["correlation"].insert_one({"ticker": "TSLA", "correlations": STOCKS})
+
+    async def get_forecast(model=None):
+        return fake_forecast
+
+    monkeypatch.setattr(service, "get_forecast", get_forecast)
+    monkeypatch.setattr(service, "llm_batch_mode", True)
+    llm = FakeLLM()
+    service.app.dependency_overrides[service.get_clients] = lambda: FakeClients(mongo_db, llm)
+    yield TestClient(service.app), llm
+    service.app.dependency_overrides.clear()
+
+
+def test_recommendation_endpoint_batches_related_tickers(client):
+    api, llm = client
+
+    response = api.get("/stock_recommendation", params={"user_input": "should I buy TSLA"})
+
+    assert response.status_code == 200
+    assert [item["stock_name"] for item in response.json()] == ["TSLA"] + STOCKS
+    assert len(llm.prompts) == 1
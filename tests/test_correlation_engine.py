@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from correlation_engine import compute_top_k_correlation_dict, correlation_blocks, synthetic_close_prices
+
+
+def correlation_matrix(returns, weights=None, block_size=7):
+    n_tickers = returns.shape[1]
+    matrix = np.empty((n_tickers, n_tickers))
+    for start, block in correlation_blocks(returns, weights, block_size):
+        matrix[start:start + len(block)] = block
+    return matrix
+
+
+def gappy_close_prices(n_tickers=30, missing=0.5, seed=1):
+    close_df = synthetic_close_prices(n_tickers, n_days=250, n_factors=3, seed=seed)
+    rng = np.random.default_rng(seed)
+    # Half of the first ticker's days and a late listing for the second
+    close_df.iloc[rng.random(len(close_df)) < missing, 0] = np.nan
+    close_df.iloc[:150, 1] = np.nan
+    return close_df
+
+
+def test_gaps_use_pairwise_complete_observations():
+    returns = gappy_close_prices().pct_change().iloc[1:]
+
+    matrix = correlation_matrix(returns.to_numpy())
+
+    expected = returns.corr().to_numpy()
+    off_diagonal = ~np.eye(len(expected), dtype=bool)
+    np.testing.assert_allclose(matrix[off_diagonal], expected[off_diagonal], atol=1e-9)
+
+
+def test_gappy_ticker_keeps_its_neighbours():
+    close_df = gappy_close_prices()
+    returns = close_df.pct_change().dropna(how="all", axis=0)
+    corr = returns.corr()
+    expected = {
+        ticker: set(corr[ticker][corr[ticker] > 0.4].drop(labels=[ticker]).index)
+        for ticker in close_df.columns
+    }
+
+    actual = compute_top_k_correlation_dict(close_df, k=None, threshold=0.4)
+
+    assert {ticker: set(neighbours) for ticker, neighbours in actual.items()} == expected
+    assert len(actual[close_df.columns[0]]) > 2
+
+
+def test_missing_days_match_the_complete_path_with_weights():
+    returns = synthetic_close_prices(20, n_days=120, seed=2).pct_change().iloc[1:].to_numpy()
+    weights = 0.5 ** (np.arange(len(returns))[::-1] / 20)
+    # A day nobody traded must not change anything, weighted or not
+    gappy = np.vstack([returns[:60], np.full((1, returns.shape[1]), np.nan), returns[60:]])
+    gappy_weights = np.concatenate([weights[:60], [1.0], weights[60:]])
+
+    np.testing.assert_allclose(correlation_matrix(gappy), correlation_matrix(returns), atol=1e-5)
+    np.testing.assert_allclose(correlation_matrix(gappy, gappy_weights), correlation_matrix(returns, weights), atol=1e-5)
+
+
+def test_pairs_without_overlap_are_never_neighbours():
+    close_df = synthetic_close_prices(4, n_days=40, seed=3)
+    close_df.iloc[20:, 0] = np.nan
+    close_df.iloc[:21, 1] = np.nan
+
+    neighbours = compute_top_k_correlation_dict(close_df, k=3)
+
+    assert close_df.columns[1] not in neighbours[close_df.columns[0]]
+    assert close_df.columns[0] not in neighbours[close_df.columns[1]]
@@ -0,0 +1,72 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+from compute_stock_relation import store_correlations_in_db
+
+COLLECTION = "correlation"
+
+
+@pytest.fixture
+def client():
+    return mongomock.MongoClient()
+
+
+def store(client, correlation_dict, drop_existing=False):
+    store_correlations_in_db(correlation_dict, None, "finance_buddy_test", COLLECTION,
+                             drop_existing=drop_existing, client=client)
+    return client["finance_buddy_test"][COLLECTION]
+
+
+def stored(collection):
+    return {doc["ticker"]: doc["correlations"] for doc in collection.find({}, {"_id": 0})}
+
+
+def has_unique_ticker_index(collection):
+    return any(
+        index.get("unique") and index["key"] == [("ticker", 1)]
+        for index in collection.index_information().values()
+    )
+
+
+def test_rerun_is_idempotent(client):
+    correlations = {"AAPL": ["MSFT"], "MSFT": ["AAPL", "NVDA"], "NVDA": ["MSFT"]}
+
+    store(client, correlations)
+    collection = store(client, correlations)
+
+    assert collection.count_documents({}) == 3
+    assert stored(collection) == correlations
+    assert has_unique_ticker_index(collection)
+
+
+def test_upsert_updates_changed_tickers_and_keeps_others(client):
+    store(client, {"AAPL": ["MSFT"], "MSFT": ["AAPL"]})
+    collection = store(client, {"AAPL": ["NVDA"], "NVDA": ["AAPL"]})
+
+    assert stored(collection) == {"AAPL": ["NVDA"], "MSFT": ["AAPL"], "NVDA": ["AAPL"]}
+
+
+def test_drop_existing_replaces_contents(client):
+    store(client, {"AAPL": ["MSFT"], "MSFT": ["AAPL"]})
+    collection = store(client, {"NVDA": ["AMD"]}, drop_existing=True)
+
+    assert stored(collection) == {"NVDA": ["AMD"]}
+    assert has_unique_ticker_index(collection)
+    assert f"{COLLECTION}_shadow" not in client["finance_buddy_test"].list_collection_names()
+
+
+def test_legacy_duplicates_are_rebuilt(client):
+    # Older runs appended a new document per ticker on every run, without an index
+    legacy = client["finance_buddy_test"][COLLECTION]
+    legacy.insert_many([
+        {"ticker": "AAPL", "correlations": ["OLD"]},
+        {"ticker": "AMZN", "correlations": ["OLD"]},
+        {"ticker": "AAPL", "correlations": ["OLDER"]},
+        {"ticker": "AMZN", "correlations": ["LATEST"]},
+    ])
+
+    collection = store(client, {"AAPL": ["MSFT"], "MSFT": ["AAPL"]})
+
+    assert stored(collection) == {"AAPL": ["MSFT"], "MSFT": ["AAPL"], "AMZN": ["LATEST"]}
+    assert collection.count_documents({}) == 3
+    assert has_unique_ticker_index(collection)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.forecast_cache import Forecast
+from app.models import LSTMForecaster, RoutedForecast
+from app.snapshot import PublishedModels, SnapshotReader, publish
+from app.universe import Universe
+from conftest import MODEL_PATH, PersistenceBackend, closes
+
+TICKERS = ["AAPL", "MSFT", "NVDA"]
+
+
+def lstm(scenarios=0):
+    forecaster = LSTMForecaster(MODEL_PATH, scenarios=scenarios, noise_scale=0.05)
+    forecaster.tickers = TICKERS
+    forecaster.backend, forecaster.lookback = PersistenceBackend(), 60
+    return forecaster
+
+
+def banded_forecast():
+    return lstm(scenarios=16).forecast(closes(TICKERS), Universe(TICKERS), horizon=3)
+
+
+def test_scenarios_add_bands_around_the_point_forecast():
+    universe = Universe(TICKERS)
+    close_df = closes(TICKERS)
+
+    plain = lstm().forecast(close_df, universe, horizon=3)
+    banded = lstm(scenarios=16).forecast(close_df, universe, horizon=3)
+
+    assert plain.bands == {}
+    np.testing.assert_allclose(banded.values, plain.values, rtol=1e-6)
+    assert sorted(banded.bands) == [0.05, 0.5, 0.95]
+    assert np.all(banded.bands[0.05] <= banded.bands[0.5])
+    assert np.all(banded.bands[0.5] <= banded.bands[0.95])
+    assert np.all(banded.bands[0.95] - banded.bands[0.05] > 0)
+
+
+def test_scenario_settings_are_part_of_the_version():
+    assert LSTMForecaster(MODEL_PATH, scenarios=16).version != LSTMForecaster(MODEL_PATH).version
+
+
+def test_bands_survive_the_cache_and_published_snapshots(tmp_path):
+    forecast = banded_forecast()
+
+    restored = Forecast.from_dict(forecast.to_dict())
+    close_df = pd.DataFrame(np.ones((2, len(TICKERS))), index=pd.bdate_range("2025-01-01", periods=2), columns=TICKERS)
+    publish(str(tmp_path), "2025-01-02", close_df, {"lstm": ("v1", forecast)}, {"default": "lstm", "models": {}})
+    published = SnapshotReader(str(tmp_path), check_seconds=0).current().forecasts["lstm"][1]
+
+    for copy in (restored, published):
+        assert sorted(copy.bands) == sorted(forecast.bands)
+        for q, band in forecast.bands.items():
+            np.testing.assert_allclose(copy.bands[q], band)
+
+
+def test_forecast_endpoint_returns_bands(service, monkeypatch):
+    registry = PublishedModels({"default": "lstm", "models": {"lstm": {}}, "horizons": {"NVDA": 2}})
+    routed = RoutedForecast({"lstm": ("v1", banded_forecast())}, registry, horizon=3, data_date="2025-01-02")
+
+    async def get_forecast(model=None):
+        return routed
+
+    monkeypatch.setattr(service, "get_forecast", get_forecast)
+    client = TestClient(service.app)
+
+    body = client.get("/forecast/NVDA").json()
+
+    assert body["model"] == "lstm" and body["version"] == "v1" and body["data_date"] == "2025-01-02"
+    assert len(body["predictions"]) == 2
+    assert sorted(body["bands"]) == ["0.05", "0.5", "0.95"]
+    assert all(len(band) == 2 for band in body["bands"].values())
+    assert client.get("/forecast/ZZZZ").status_code == 404
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+from app.inference import BACKENDS, create_backend, rollout
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "data", "lstm_model.h5")
+ATOL = 1e-4
+
+
+@pytest.fixture(scope="module")
+def model_copy(tmp_path_factory):
+    # TFLiteBackend caches its conversion next to the model; keep it out of app/data
+    path = str(tmp_path_factory.mktemp("model") / "lstm_model.h5")
+    shutil.copy(MODEL_PATH, path)
+    return path, tf.keras.models.load_model(path)
+
+
+@pytest.fixture(scope="module")
+def windows(model_copy):
+    _, model = model_copy
+    _, timesteps, features = model.input_shape
+    rng = np.random.default_rng(0)
+    return rng.uniform(0.0, 1.0, size=(4, timesteps, features)).astype(np.float32)
+
+
+@pytest.mark.parametrize("name", [name for name in BACKENDS if name != "keras_predict"])
+def test_backend_matches_keras_predict(model_copy, windows, name):
+    path, model = model_copy
+    expected = model.predict(windows, verbose=0)
+
+    backend = create_backend(name, model, path)
+
+    # Single windows and a batch, so TFLite's tensor resize is exercised too
+    np.testing.assert_allclose(backend.predict(windows[:1]), expected[:1], atol=ATOL)
+    np.testing.assert_allclose(backend.predict(windows), expected, atol=ATOL)
+
+
+def test_tflite_conversion_leaves_no_tmp_files(model_copy):
+    path, model = model_copy
+
+    create_backend("tflite", model, path)
+
+    directory = os.path.dirname(path)
+    assert os.path.exists(os.path.splitext(path)[0] + ".tflite")
+    assert not [entry for entry in os.listdir(directory) if entry.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_rollout_matches_list_window_loop(model_copy, windows, name):
+    path, model = model_copy
+    horizon = 5
+
+    # The loop rollout replaced: predict, drop the oldest row, append the prediction
+    window = windows[0].copy()
+    expected = []
+    for _ in range(horizon):
+        prediction = model.predict(window[None], verbose=0)[0]
+        expected.append(prediction)
+        window = np.vstack([window[1:], prediction])
+
+    predictions = rollout(create_backend(name, model, path), windows[0], horizon)
+
+    assert predictions.shape == (1, horizon, windows.shape[2])
+    np.testing.assert_allclose(predictions[0], np.array(expected), atol=ATOL)
@@ -0,0 +1,68 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.models import LSTMForecaster, load_feature_tickers
+from app.universe import Universe
+from conftest import MODEL_PATH, PersistenceBackend, closes
+
+FEATURES_PATH = os.path.join(os.path.dirname(MODEL_PATH), "lstm_model.features.json")
+
+
+def grown_universe():
+    # One ticker more than the model was trained on, listed first
+    return Universe(["NEWCO"] + load_feature_tickers(FEATURES_PATH), "grown")
+
+
+def test_forecast_columns_come_from_the_feature_file():
+    forecaster = LSTMForecaster(MODEL_PATH)
+    forecaster.tickers = load_feature_tickers(FEATURES_PATH)
+    forecaster.backend, forecaster.lookback = PersistenceBackend(), 60
+    universe = grown_universe()
+    close_df = closes(universe.tickers)
+
+    forecast = forecaster.forecast(close_df, universe, horizon=3)
+
+    assert forecast.universe.tickers == forecaster.tickers
+    assert "NEWCO" not in forecast
+    # Persistence of the last close, scaled and unscaled again
+    np.testing.assert_allclose(forecast.values[0], close_df[forecaster.tickers].iloc[-1].to_numpy())
+
+
+def test_default_feature_file_sits_next_to_the_model():
+    assert LSTMForecaster(MODEL_PATH).features_path == os.path.splitext(MODEL_PATH)[0] + ".features.json"
+
+
+def test_lstm_serves_a_grown_universe():
+    pytest.importorskip("tensorflow")
+    forecaster = LSTMForecaster(MODEL_PATH, FEATURES_PATH, backend="keras_predict")
+    forecaster.load()
+    universe = grown_universe()
+
+    forecast = forecaster.forecast(closes(universe.tickers), universe, horizon=2)
+
+    assert forecast.values.shape == (2, len(universe) - 1)
+    assert "NEWCO" not in forecast
+
+
+def test_feature_file_must_match_the_model(tmp_path):
+    pytest.importorskip("tensorflow")
+    features_path = tmp_path / "features.json"
+    features_path.write_text(json.dumps({"tickers": ["NEWCO"] + load_feature_tickers(FEATURES_PATH)}))
+
+    with pytest.raises(ValueError, match="features"):
+        LSTMForecaster(MODEL_PATH, str(features_path), backend="keras_predict").load()
+
+    with pytest.raises(ValueError, match="No feature file"):
+        LSTMForecaster(MODEL_PATH, str(tmp_path / "missing.json"), backend="keras_predict").load()
+
+
+def test_feature_order_is_the_yfinance_column_order():
+    tickers = load_feature_tickers(FEATURES_PATH)
+
+    # The model was fed yf.download(...)['Close'], whose columns yfinance sorts by ticker
+    assert tickers == sorted(tickers)
+    assert tickers.index("FOX") < tickers.index("FOXA") < tickers.index("FTNT")
+    assert len(tickers) == 99
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.price_store import CsvFixtureSource, PriceStore, fcntl
+
+
+class FakeSource:
+    """
+    In-memory price source in the yf.download layout. 'closes' maps tickers to
+    a Series of closes as the source would adjust them today; edit it to
+    simulate a split. Every fetch is recorded in 'calls'.
+    """
+
+    def __init__(self, closes):
+        self.closes = closes
+        self.calls = []
+
+    def fetch(self, tickers, start, end):
+        self.calls.append((sorted(tickers), start, end))
+        frames = {}
+        for ticker in tickers:
+            if ticker not in self.closes:
+                continue
+            close = self.closes[ticker]
+            close = close.loc[(close.index >= start) & (close.index < end)]
+            frames[ticker] = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0})
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+
+def closes(start="2024-01-01", end="2024-03-01", base=100.0):
+    dates = pd.bdate_range(start, end, inclusive="left")
+    return pd.Series(base + np.arange(len(dates), dtype="float64"), index=dates)
+
+
+@pytest.fixture
+def source():
+    return FakeSource({"NVDA": closes(), "AAPL": closes(base=200.0)})
+
+
+@pytest.fixture
+def store(tmp_path, source):
+    return PriceStore(root=str(tmp_path), source=source)
+
+
+def test_split_after_storing_rebuilds_history(store, source):
+    store.ensure(["NVDA", "AAPL"], "2024-01-01", "2024-02-01")
+
+    # 10:1 split: the source now reports every past NVDA close divided by 10
+    source.closes["NVDA"] = source.closes["NVDA"] / 10
+    source.calls.clear()
+    store.ensure(["NVDA", "AAPL"], "2024-01-01", "2024-03-01")
+
+    close = store.load(["NVDA", "AAPL"], end="2024-03-01")
+    assert list(close.index) == list(source.closes["NVDA"].index)
+    np.testing.assert_allclose(close["NVDA"].to_numpy(), source.closes["NVDA"].to_numpy())
+    np.testing.assert_allclose(close["AAPL"].to_numpy(), source.closes["AAPL"].to_numpy())
+    # The unaffected ticker only got the new days; the split one was re-downloaded in full
+    assert source.calls[-1] == (["NVDA"], "2024-01-01", "2024-03-01")
+
+
+def test_dividend_adjustment_is_picked_up(store, source):
+    store.ensure(["AAPL"], "2024-01-01", "2024-02-01")
+
+    source.closes["AAPL"] = source.closes["AAPL"] * 0.995
+    store.ensure(["AAPL"], "2024-01-01", "2024-03-01")
+
+    close = store.load(["AAPL"], end="2024-03-01")["AAPL"]
+    np.testing.assert_allclose(close.to_numpy(), source.closes["AAPL"].to_numpy())
+
+
+def test_update_refetches_only_an_overlap(store, source):
+    store.ensure(["NVDA", "AAPL"], "2024-01-01", "2024-02-01")
+    source.calls.clear()
+
+    store.ensure(["NVDA", "AAPL"], "2024-01-01", "2024-03-01")
+
+    assert source.calls == [(["AAPL", "NVDA"], "2024-01-25", "2024-03-01")]
+    assert len(store.load(["NVDA"], end="2024-03-01")) == len(source.closes["NVDA"])
+
+
+def test_covered_range_is_not_fetched_again(store, source):
+    store.ensure(["NVDA"], "2024-01-01", "2024-03-01")
+    source.calls.clear()
+
+    store.ensure(["NVDA"], "2024-01-15", "2024-02-15")
+
+    assert source.calls == []
+    assert store.missing_ranges("NVDA", "2024-01-15", "2024-02-15") == []
+
+
+def test_missing_ranges_overlap_the_stored_range(store):
+    store.ensure(["NVDA"], "2024-01-15", "2024-02-01")
+
+    assert store.missing_ranges("NVDA", "2024-01-01", "2024-03-01") == [
+        ("2024-01-01", "2024-01-22"),
+        ("2024-01-25", "2024-03-01"),
+    ]
+    assert store.missing_ranges("AAPL", "2024-01-01", "2024-03-01") == [("2024-01-01", "2024-03-01")]
+
+
+def test_ticker_missing_from_a_batch_is_not_asked_for_until_the_ttl_passes(store, source):
+    store.ensure(["NVDA", "GONE"], "2024-01-01", "2024-02-01")
+    assert store._read_meta("GONE")["empty_until"] > time.time()
+    source.calls.clear()
+
+    store.ensure(["NVDA", "GONE"], "2024-01-01", "2024-02-01")
+    assert source.calls == []
+
+    meta = store._read_meta("GONE")
+    meta["empty_until"] = time.time() - 1
+    store._write_meta("GONE", meta)
+    store.ensure(["GONE"], "2024-01-01", "2024-02-01")
+    assert source.calls == [(["GONE"], "2024-01-01", "2024-02-01")]
+
+
+def test_failed_download_is_retried(store, source, monkeypatch):
+    def fail(tickers, start, end):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(source, "fetch", fail)
+    store.ensure(["NVDA"], "2024-01-01", "2024-02-01")
+    monkeypatch.undo()
+
+    assert store.missing_ranges("NVDA", "2024-01-01", "2024-02-01") == [("2024-01-01", "2024-02-01")]
+    store.ensure(["NVDA"], "2024-01-01", "2024-02-01")
+    assert len(store.load(["NVDA"])) == len(source.closes["NVDA"].loc[:"2024-01-31"])
+
+
+@pytest.mark.skipif(fcntl is None, reason="flock is POSIX only")
+def test_readers_wait_for_another_process_writing(store):
+    store.ensure(["NVDA"], "2024-01-01", "2024-02-01")
+    finished = threading.Event()
+
+    # A separate open file description conflicts like another worker process would
+    with open(os.path.join(store._ticker_dir("NVDA"), ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        reader = threading.Thread(target=lambda: (store.load(["NVDA"]), finished.set()))
+        reader.start()
+        assert not finished.wait(0.2)
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    reader.join(5)
+
+    assert finished.is_set()
+
+
+def _ensure_in_process(root, fixture_dir, ranges):
+    store = PriceStore(root=root, source=CsvFixtureSource(fixture_dir))
+    for start, end in ranges:
+        store.ensure(["NVDA", "AAPL"], start, end)
+
+
+@pytest.mark.skipif(fcntl is None, reason="flock is POSIX only")
+def test_concurrent_writer_processes_keep_one_consistent_history(tmp_path, source):
+    fixture_dir = tmp_path / "csv"
+    fixture_dir.mkdir()
+    for ticker, close in source.closes.items():
+        pd.DataFrame({"Date": close.index, "Close": close.to_numpy()}).to_csv(fixture_dir / f"{ticker}.csv", index=False)
+    root = str(tmp_path / "store")
+    ranges = [("2024-01-01", "2024-01-20"), ("2024-01-10", "2024-02-10"), ("2024-01-01", "2024-03-01")]
+
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_ensure_in_process, args=(root, str(fixture_dir), ranges[i:] + ranges[:i]))
+               for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+
+    assert [worker.exitcode for worker in workers] == [0, 0, 0]
+    close = PriceStore(root=root, source=source).load(["NVDA", "AAPL"])
+    assert close.index.is_unique and close.index.is_monotonic_increasing
+    np.testing.assert_allclose(close["NVDA"].to_numpy(), source.closes["NVDA"].to_numpy())
+    assert not [name for name in os.listdir(os.path.join(root, "NVDA")) if ".tmp" in name]
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import FakeClients, FakeLLM
+
+RELATED = ["AAPL", "NVDA", "MSFT", "AMZN"]
+
+
+@pytest.fixture
+def api(service, mongo_db, fake_forecast, monkeypatch):
+    """
+    TestClient with the Clients dependency overridden and the forecast faked;
+    the lifespan (model warm-up) is not started.
+    """
+    mongo_db["correlation"].insert_one({"ticker": "TSLA", "correlations": RELATED})
+
+    async def get_forecast(model=None):
+        return fake_forecast
+
+    monkeypatch.setattr(service, "get_forecast", get_forecast)
+    monkeypatch.setattr(service, "llm_batch_mode", False)
+
+    def connect(llm):
+        service.app.dependency_overrides[service.get_clients] = lambda: FakeClients(mongo_db, llm)
+        return TestClient(service.app)
+
+    yield connect
+    service.app.dependency_overrides.clear()
+
+
+def test_related_tickers_are_scored_concurrently(api):
+    llm = FakeLLM(delay=0.3)
+    client = api(llm)
+
+    started = time.perf_counter()
+    response = client.get("/stock_recommendation", params={"user_input": "should I buy TSLA"})
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert [item["stock_name"] for item in response.json()] == ["TSLA"] + RELATED
+    assert len(llm.prompts) == 5
+    # Five LLM round trips in parallel cost about one, not five
+    assert elapsed < 0.3 * 2.5
+    assert llm.peak_in_flight > 1
+
+
+def test_timed_out_ticker_returns_partial_result(api, service, monkeypatch):
+    monkeypatch.setattr(service, "llm_timeout_seconds", 0.2)
+    client = api(FakeLLM(delays={"NVDA": 1.0}))
+
+    response = client.get("/stock_recommendation", params={"user_input": "should I buy TSLA"})
+
+    assert response.status_code == 200
+    results = {item["stock_name"]: item for item in response.json()}
+    assert "error" in results["NVDA"]
+    assert all("error" not in results[ticker] for ticker in ["TSLA", "AAPL", "MSFT", "AMZN"])
+
+
+def test_llm_concurrency_bound_holds_under_timeouts(service, monkeypatch):
+    monkeypatch.setattr(service, "llm_timeout_seconds", 0.1)
+    monkeypatch.setattr(service, "llm_semaphore", asyncio.Semaphore(2))
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(service, "llm_executor", executor)
+    llm = FakeLLM(delay=0.4)
+
+    async def run():
+        return await asyncio.gather(*(service.recommend_ticker(llm, f"T{i}", [1.0], {}) for i in range(8)))
+
+    results = asyncio.run(run())
+    executor.shutdown(wait=True)
+
+    assert all("error" in result for result in results)
+    # Timed-out calls keep their thread until Gemini answers, so the bound must still hold
+    assert llm.peak_in_flight <= 2
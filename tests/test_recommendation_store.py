@@ -0,0 +1,42 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+from app.recommendation_store import LEGACY_INDEX, ensure_indexes, load_recommendations, save_recommendations
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["finance_buddy_test"]["recommendation"]
+
+
+def test_model_versions_are_stored_side_by_side(collection):
+    ensure_indexes(collection)
+
+    save_recommendations(collection, {"AAPL": {"action": "buy"}}, "2025-01-02", "lstm-1")
+    save_recommendations(collection, {"AAPL": {"action": "sell"}}, "2025-01-02", "drift-lookback20")
+    save_recommendations(collection, {"AAPL": {"action": "hold"}}, "2025-01-02", "lstm-1")
+
+    assert collection.count_documents({}) == 2
+    assert load_recommendations(collection, ["AAPL"], "2025-01-02", "lstm-1") == {"AAPL": {"action": "hold"}}
+    assert load_recommendations(collection, ["AAPL"], "2025-01-02", "drift-lookback20") == {"AAPL": {"action": "sell"}}
+
+
+def test_error_entries_are_not_stored(collection):
+    saved = save_recommendations(collection, {"AAPL": {"error": "Timed out"}, "MSFT": {"action": "buy"}},
+                                 "2025-01-02", "lstm-1")
+
+    assert saved == 1
+    assert load_recommendations(collection, ["AAPL", "MSFT"], "2025-01-02", "lstm-1") == {"MSFT": {"action": "buy"}}
+
+
+def test_legacy_index_is_replaced(collection):
+    collection.create_index([("ticker", 1), ("data_date", 1)], unique=True)
+
+    ensure_indexes(collection)
+
+    indexes = collection.index_information()
+    assert LEGACY_INDEX not in indexes
+    assert any(
+        index.get("unique") and index["key"] == [("ticker", 1), ("data_date", 1), ("model_version", 1)]
+        for index in indexes.values()
+    )
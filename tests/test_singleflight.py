@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+class Counter:
+    """
+    Coroutine factory counting how often the work really starts.
+    """
+
+    def __init__(self, result="done", delay=0.05, error=None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.finished = 0
+
+    async def work(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        self.finished += 1
+        return self.result
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight("test")
+    counter = Counter()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", counter.work) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["done"] * 5
+    assert counter.calls == 1
+
+
+def test_results_are_not_cached_after_completion():
+    flight = SingleFlight("test")
+    counter = Counter()
+
+    async def run():
+        await flight.do("key", counter.work)
+        await flight.do("key", counter.work)
+        return flight._inflight
+
+    assert asyncio.run(run()) == {}
+    assert counter.calls == 2
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    counter = Counter()
+
+    async def run():
+        return await asyncio.gather(flight.do("a", counter.work), flight.do("b", counter.work))
+
+    asyncio.run(run())
+    assert counter.calls == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight("test")
+    counter = Counter(delay=0.2)
+
+    async def run():
+        impatient = asyncio.ensure_future(flight.do("key", counter.work))
+        patient = flight.do("key", counter.work)
+        await asyncio.sleep(0.05)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(run()) == "done"
+    assert counter.calls == 1 and counter.finished == 1
+
+
+def test_timed_out_caller_leaves_work_running_for_the_next_one():
+    flight = SingleFlight("test")
+    counter = Counter(delay=0.2)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.do("key", counter.work), 0.05)
+        # The same computation is still in flight and is joined, not restarted
+        return await flight.do("key", counter.work)
+
+    assert asyncio.run(run()) == "done"
+    assert counter.calls == 1
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flight = SingleFlight("test")
+    failing = Counter(error=ValueError("boom"))
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("key", failing.work) for _ in range(3)), return_exceptions=True)
+        recovered = await flight.do("key", Counter(result="ok").work)
+        return results, recovered
+
+    results, recovered = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert failing.calls == 1
+    assert recovered == "ok"
+
+
+def test_do_many_batches_only_missing_keys():
+    flight = SingleFlight("test")
+    batches = []
+
+    async def compute(keys):
+        batches.append(list(keys))
+        await asyncio.sleep(0.05)
+        return {key: key.upper() for key in keys}
+
+    async def run():
+        first = flight.do_many(["a", "b"], compute)
+        second = flight.do_many(["b", "c", "c"], compute)
+        return ({key: await result for key, result in first.items()},
+                {key: await result for key, result in second.items()})
+
+    first, second = asyncio.run(run())
+    assert first == {"a": "A", "b": "B"}
+    assert second == {"b": "B", "c": "C"}
+    assert batches == [["a", "b"], ["c"]]
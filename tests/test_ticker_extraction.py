@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.ticker_matcher import ExtractionCache
+from conftest import FakeClients, FakeLLM
+
+QUERIES = [f"that company people mention number {i}" for i in range(8)]
+
+
+@pytest.fixture
+def bounded(service, monkeypatch):
+    """
+    Two LLM slots and two executor threads, so an unbounded caller shows up at once.
+    """
+    monkeypatch.setattr(service, "llm_semaphore", asyncio.Semaphore(2))
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(service, "llm_executor", executor)
+    monkeypatch.setattr(service, "extraction_cache", ExtractionCache())
+    yield service
+    executor.shutdown(wait=True)
+
+
+def test_known_company_is_resolved_without_the_llm(service):
+    llm = FakeLLM()
+
+    stock_details = asyncio.run(service.extract_stock_details(llm, "should I buy TSLA"))
+
+    assert stock_details["ticker"] == "TSLA"
+    assert llm.prompts == []
+
+
+def test_rate_limit_wait_holds_no_thread_and_no_timeout(bounded, monkeypatch):
+    service = bounded
+    # 8 queries at 10 per second take ~0.8s in total, well past the per-call timeout
+    monkeypatch.setattr(service, "llm_timeout_seconds", 0.3)
+    llm = FakeLLM(requests_per_minute=600, tickers={query: "AAPL" for query in QUERIES})
+
+    async def run():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        extraction = asyncio.gather(*(service.extract_stock_details(llm, query) for query in QUERIES))
+        await asyncio.sleep(0.05)
+        # Work with no LLM call must not queue behind threads sleeping for rate-limit slots
+        started = time.perf_counter()
+        await asyncio.to_thread(lambda: None)
+        unrelated = time.perf_counter() - started
+        return await extraction, unrelated
+
+    details, unrelated = asyncio.run(run())
+
+    assert [stock_details["ticker"] for stock_details in details] == ["AAPL"] * len(QUERIES)
+    assert unrelated < 0.1
+    assert llm.peak_in_flight <= 2
+
+
+def test_extraction_timeout_is_a_504(bounded, monkeypatch):
+    service = bounded
+    monkeypatch.setattr(service, "llm_timeout_seconds", 0.1)
+    llm = FakeLLM(delay=0.5)
+
+    with pytest.raises(service.HTTPException) as raised:
+        asyncio.run(service.extract_stock_details(llm, QUERIES[0]))
+
+    assert raised.value.status_code == 504
+
+
+def test_batch_endpoint_extracts_queries_within_the_llm_bound(bounded, mongo_db, fake_forecast, monkeypatch):
+    service = bounded
+
+    async def get_forecast(model=None):
+        return fake_forecast
+
+    monkeypatch.setattr(service, "get_forecast", get_forecast)
+    llm = FakeLLM(delay=0.1, tickers={query: "AAPL" for query in QUERIES})
+    service.app.dependency_overrides[service.get_clients] = lambda: FakeClients(mongo_db, llm)
+    try:
+        response = TestClient(service.app).post(
+            "/stock_recommendation/batch", json={"tickers": [], "queries": QUERIES}
+        )
+    finally:
+        service.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["queries"] == {query: "AAPL" for query in QUERIES}
+    assert llm.peak_in_flight <= 2